@@ -0,0 +1,22 @@
+from functools import lru_cache
+import httpx
+from anthropic import Anthropic, DefaultHttpxClient
+
+# Sized for MAX_WORKERS schools x MAX_CONTACT_WORKERS contacts calling at once, with room to spare
+POOL_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+# Fail fast on connection problems; reads keep the SDK's long default for slow web-search calls
+TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+
+
+@lru_cache(maxsize=4)
+def get_client(api_key: str) -> Anthropic:
+    """
+    Process-wide Anthropic client for an API key.
+
+    Shared by every EmailGenerator, so keep-alive connections (and their TLS sessions)
+    survive from one generation run to the next instead of being rebuilt per batch.
+    """
+    http_client = DefaultHttpxClient(limits=POOL_LIMITS, timeout=TIMEOUT)
+    # Retries (429s, connection errors, 5xx/529) happen in one place, rate_limit._call_with_backoff,
+    # which also waits on the limiter
+    return Anthropic(api_key=api_key, http_client=http_client, max_retries=0)
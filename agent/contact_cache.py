@@ -0,0 +1,25 @@
+import hashlib
+from typing import Dict, List, Optional
+import config
+from .shelf_cache import ShelfCache
+
+# Bump when the research prompt changes so stale results are not reused
+PROMPT_VERSION = "v1"
+
+
+class ContactCache(ShelfCache):
+    """Persistent cache of researched contacts keyed by school name, model, and prompt version."""
+
+    def __init__(self, cache_dir: str, ttl_seconds: int):
+        super().__init__(cache_dir, 'contacts', ttl_seconds)
+
+    def _key(self, school_name: str) -> str:
+        return hashlib.sha1(f"{school_name}|{config.MODEL}|{PROMPT_VERSION}".encode()).hexdigest()
+
+    def get(self, school_name: str) -> Optional[List[Dict]]:
+        """Return cached contacts for a school, or None on a miss or expired entry."""
+        return self.get_entry(self._key(school_name))
+
+    def set(self, school_name: str, contacts: List[Dict]):
+        """Store validated contacts for a school."""
+        self.set_entry(self._key(school_name), contacts)
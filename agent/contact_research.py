@@ -1,15 +1,65 @@
+import json
+import logging
+import re
 from email_validator import validate_email, EmailNotValidError
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import Callable, List, Dict, Optional
 import config
 import anthropic
+from .client import get_client
+from .contact_cache import ContactCache
+from .rate_limit import RateLimiter, stream_message
+from .school_key import SchoolKey
+
+logger = logging.getLogger(__name__)
+
+# JSON object inside a markdown code fence (``` or ```json)
+_FENCE_RE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL)
+
+# Plain lowercase ASCII dot-atom addresses, which need none of email_validator's extra handling
+_FAST_EMAIL_RE = re.compile(r'^[a-z0-9_%+-]+(?:\.[a-z0-9_%+-]+)*@[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,24}$')
+
+
+def _loose_json_parse(text: str) -> Dict:
+    """Decode the first parseable JSON object in text, or {} if there is none."""
+    decoder = json.JSONDecoder()
+    idx = text.find('{')
+    while idx != -1:
+        try:
+            return decoder.raw_decode(text, idx)[0]
+        except json.JSONDecodeError:
+            idx = text.find('{', idx + 1)
+    return {}
+
+
+@lru_cache(maxsize=4096)
+def _validate_domain(domain: str) -> bool:
+    """Check an email domain once; contacts at the same school share the result."""
+    try:
+        validate_email(f"a@{domain}", check_deliverability=False)
+        return True
+    except EmailNotValidError:
+        return False
 
 
 class ContactResearcher:
     """Handles web search and contact extraction using Claude's native web search tool."""
 
-    def __init__(self, brave_api_key: str, anthropic_api_key: str):
+    def __init__(
+        self,
+        brave_api_key: str,
+        anthropic_api_key: str,
+        rate_limiter: Optional[RateLimiter] = None,
+        client: Optional[anthropic.Anthropic] = None
+    ):
         # Note: brave_api_key is no longer used but kept for compatibility
-        self.anthropic_client = anthropic.Anthropic(api_key=anthropic_api_key)
+        # Reuse a shared client when given so its keep-alive connection pool is shared too
+        self.anthropic_client = client or get_client(anthropic_api_key)
+        self.rate_limiter = rate_limiter
+        self.cache = (
+            ContactCache(config.CACHE_DIR, config.CONTACT_CACHE_TTL_SECONDS)
+            if config.CONTACT_CACHE_ENABLED else None
+        )
 
     def research_contacts(self, school_name: str, school_data: Dict) -> List[Dict]:
         """
@@ -22,22 +72,78 @@ class ContactResearcher:
         Returns:
             List of contact dictionaries with name, email, title, confidence
         """
-        print(f"  Using Claude's native web search to find contacts...")
+        cached = self.cache.get(school_name) if self.cache else None
+        if cached is not None:
+            logger.info("  Using %d cached contacts for %s", len(cached), school_name)
+            return cached
+
+        logger.info("  Using Claude's native web search to find contacts...")
 
         # Use Claude with web search tool to find contacts
         contacts = self._search_and_extract_contacts(school_name)
+        validated_contacts = self._finalize_contacts(school_name, contacts)
+
+        # Only cache real search results, not generic fallbacks after a failed search
+        if self.cache and contacts:
+            self.cache.set(school_name, validated_contacts)
+
+        return validated_contacts
+
+    def research_contacts_batch(self, school_names: List[str]) -> Dict[str, List[Dict]]:
+        """
+        Research contacts for several schools with a single web search call.
+
+        Schools missing from the batch response fall back to the single-school search.
+
+        Args:
+            school_names: Names of the schools to research
+
+        Returns:
+            Dict mapping school name to its list of validated contacts
+        """
+        results = {}
+        if self.cache:
+            for school_name in school_names:
+                cached = self.cache.get(school_name)
+                if cached is not None:
+                    results[school_name] = cached
+
+        to_search = [name for name in school_names if name not in results]
+        if not to_search:
+            logger.info("  Using cached contacts for all %d schools", len(school_names))
+            return results
+
+        logger.info("  Using Claude's native web search to find contacts for %d schools...", len(to_search))
+
+        found = self._search_and_extract_contacts_batch(to_search)
+
+        for school_name in to_search:
+            contacts = found.get(school_name)
+            if not contacts:
+                logger.info("  No batch result for %s, falling back to single-school search", school_name)
+                contacts = self._search_and_extract_contacts(school_name)
+            results[school_name] = self._finalize_contacts(school_name, contacts)
+
+            if self.cache and contacts:
+                self.cache.set(school_name, results[school_name])
+
+        return results
+
+    def _finalize_contacts(self, school_name: str, contacts: List[Dict]) -> List[Dict]:
+        """Validate and score raw contacts, padding with generic ones if too few were found."""
+        school = SchoolKey.from_raw(school_name)
+        score = self._make_scorer(school)
 
-        # Validate and score contacts
         validated_contacts = []
         for contact in contacts[:config.MAX_CONTACTS_PER_SCHOOL]:
-            validated = self._validate_contact(contact, school_name)
+            validated = self._validate_contact(contact, score)
             if validated:
                 validated_contacts.append(validated)
 
         # If we don't have enough contacts, add generic ones as fallback
         if len(validated_contacts) < 2:
-            print(f"  Warning: Only found {len(validated_contacts)} real contacts for {school_name}, adding generic contacts")
-            validated_contacts.extend(self._generate_generic_contacts(school_name, len(validated_contacts)))
+            logger.warning("  Only found %d real contacts for %s, adding generic contacts", len(validated_contacts), school_name)
+            validated_contacts.extend(self._generate_generic_contacts(school, len(validated_contacts)))
 
         return validated_contacts[:config.MAX_CONTACTS_PER_SCHOOL]
 
@@ -93,7 +199,8 @@ CRITICAL:
 - Return at least 2 contacts with REAL NAMES"""
 
         try:
-            response = self.anthropic_client.messages.create(
+            response = stream_message(
+                self.anthropic_client, self.rate_limiter,
                 model=config.MODEL,
                 max_tokens=2000,
                 temperature=0.3,
@@ -105,50 +212,176 @@ CRITICAL:
                 }]
             )
 
-            # Extract text from response (some blocks have text=None, must check)
-            response_text = ""
-            for content_block in response.content:
-                if hasattr(content_block, 'text') and content_block.text:
-                    response_text += content_block.text
-
-            # Log search usage
-            usage = response.usage
-            if hasattr(usage, 'server_tool_use'):
-                search_count = getattr(usage.server_tool_use, 'web_search_requests', 0)
-                print(f"  Performed {search_count} web searches")
-
-            # Parse JSON response
-            import json
-            # Extract JSON from response (handle markdown code blocks)
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0].strip()
-
-            data = json.loads(response_text)
-            contacts = []
-
-            for contact in data.get("contacts", []):
-                if contact.get("name") and contact.get("email"):
-                    contacts.append({
-                        'email': contact['email'].lower(),
-                        'name': contact['name'],
-                        'title': contact.get('title', ''),
-                        'source_url': '',
-                        'school_name': school_name
-                    })
-
-            print(f"  Extracted {len(contacts)} contacts from web search")
+            data = self._parse_json_response(response)
+            contacts = self._contacts_from_json(data.get("contacts", []), school_name)
+
+            logger.info("  Extracted %d contacts from web search", len(contacts))
             return contacts
 
         except Exception as e:
-            print(f"  Error during web search and extraction: {str(e)}")
+            logger.error("  Error during web search and extraction: %s", e)
             return []
 
-    def _validate_contact(self, contact: Dict, school_name: str) -> Optional[Dict]:
+    def _search_and_extract_contacts_batch(self, school_names: List[str]) -> Dict[str, List[Dict]]:
+        """Use one web search call to find and extract contacts for several schools."""
+
+        school_list = "\n".join(f"{i}. {name}" for i, name in enumerate(school_names, 1))
+
+        prompt = f"""Find the names and contact information for administrators at each of these schools:
+
+{school_list}
+
+YOUR TASK: For EACH school, find 2-3 real administrators with their REAL NAMES. Every school publicly lists their leadership.
+
+SEARCH STRATEGY: for each school, search for its head of school, leadership team, administration page, or staff directory.
+
+ROLES TO FIND (pick 2-3 per school):
+- Head of School / Principal / Headmaster
+- Director of Technology / IT Director
+- Head of Upper School / Head of Middle School / Head of Lower School
+- Dean of Academics / Academic Dean / Dean of Faculty
+- Assistant Head / Associate Head of School
+- Director of Curriculum / Director of Innovation
+- Chief Academic Officer / CFO / COO
+
+For each person, provide:
+1. Full name (First Last) - REQUIRED
+2. Email - guess it using the school's domain + common patterns (flast@, first.last@, firstlast@)
+3. Title - their actual job title
+
+Return as JSON, one entry per school using the number from the list above:
+{{
+  "schools": [
+    {{
+      "index": 1,
+      "name": "{school_names[0]}",
+      "contacts": [
+        {{
+          "name": "John Smith",
+          "email": "jsmith@schoolname.org",
+          "title": "Head of School"
+        }}
+      ]
+    }}
+  ]
+}}
+
+CRITICAL:
+- Include every school from the list, in order
+- Do NOT return "Administrator" or generic placeholders - find the actual person's name
+- If you can't find the exact email, GUESS it using the school's domain
+- Return at least 2 contacts with REAL NAMES per school"""
+
+        try:
+            response = stream_message(
+                self.anthropic_client, self.rate_limiter,
+                model=config.MODEL,
+                max_tokens=4000,
+                temperature=0.3,
+                messages=[{"role": "user", "content": prompt}],
+                tools=[{
+                    "type": "web_search_20250305",
+                    "name": "web_search",
+                    "max_uses": 5 * len(school_names)
+                }]
+            )
+
+            data = self._parse_json_response(response)
+            results = {}
+
+            for entry in data.get("schools", []):
+                # Prefer the list index; Claude sometimes rewrites school names
+                index = entry.get("index")
+                if isinstance(index, int) and 1 <= index <= len(school_names):
+                    school_name = school_names[index - 1]
+                elif entry.get("name") in school_names:
+                    school_name = entry["name"]
+                else:
+                    continue
+
+                results[school_name] = self._contacts_from_json(entry.get("contacts", []), school_name)
+
+            logger.info("  Extracted contacts for %d/%d schools from batch web search", len(results), len(school_names))
+            return results
+
+        except Exception as e:
+            logger.error("  Error during batch web search and extraction: %s", e)
+            return {}
+
+    def _parse_json_response(self, response) -> Dict:
+        """Collect the text blocks of a web search response and parse the JSON payload."""
+        # Extract text from response (some blocks have text=None, must check)
+        response_text = ""
+        for content_block in response.content:
+            if hasattr(content_block, 'text') and content_block.text:
+                response_text += content_block.text
+
+        # Log search usage
+        usage = response.usage
+        if hasattr(usage, 'server_tool_use'):
+            search_count = getattr(usage.server_tool_use, 'web_search_requests', 0)
+            logger.info("  Performed %d web searches", search_count)
+
+        # Extract JSON from response (handle markdown code blocks)
+        match = _FENCE_RE.search(response_text)
+        payload = match.group(1) if match else response_text
+
+        try:
+            return json.loads(payload)
+        except json.JSONDecodeError:
+            # Claude sometimes wraps the JSON in prose; take the first object that decodes
+            return _loose_json_parse(response_text)
+
+    def _contacts_from_json(self, raw_contacts: List[Dict], school_name: str) -> List[Dict]:
+        """Convert contacts from Claude's JSON into contact dicts, dropping incomplete ones."""
+        contacts = []
+
+        for contact in raw_contacts:
+            if contact.get("name") and contact.get("email"):
+                contacts.append({
+                    'email': contact['email'].lower(),
+                    'name': contact['name'],
+                    'title': contact.get('title', ''),
+                    'source_url': '',
+                    'school_name': school_name
+                })
+
+        return contacts
+
+    def _make_scorer(self, school: SchoolKey) -> Callable[[str, bool, bool, str], int]:
+        """
+        Build the confidence scorer for one school's contacts.
+
+        Everything that depends only on the school is resolved here, once, so the
+        returned function does just the per-contact checks.
+        """
+        keywords = school.keywords
+        first_keyword = keywords[0] if keywords else None
+
+        def score(domain: str, has_name: bool, has_title: bool, source_url: str) -> int:
+            confidence = 50  # Base score
+            if any(keyword in domain for keyword in keywords):  # Domain matches school name
+                confidence += 20
+            if domain.endswith('.edu'):
+                confidence += 15
+            if has_name:
+                confidence += 10
+            if has_title:
+                confidence += 15
+            if first_keyword and first_keyword in source_url:  # Source URL is the school's
+                confidence += 10
+            return min(confidence, 100)
+
+        return score
+
+    def _validate_contact(self, contact: Dict, score: Callable[[str, bool, bool, str], int]) -> Optional[Dict]:
         """
         Validate contact information and calculate confidence score.
 
+        Args:
+            contact: Raw contact dict
+            score: Confidence scorer from _make_scorer for the contact's school
+
         Returns:
             Contact dict with confidence score, or None if invalid
         """
@@ -156,49 +389,36 @@ CRITICAL:
         if not email:
             return None
 
-        # Validate email format
-        try:
-            valid = validate_email(email, check_deliverability=False)
-            email = valid.email
-        except EmailNotValidError:
-            return None
-
-        # Calculate confidence score
-        confidence = 50  # Base score
-
-        # Check if email domain matches school name
-        domain = email.split('@')[1] if '@' in email else ''
-        school_keywords = school_name.lower().split()
+        email = email.strip().lower()
 
-        for keyword in school_keywords:
-            if len(keyword) > 3 and keyword in domain:
-                confidence += 20
-                break
-
-        # Boost if from .edu domain
-        if domain.endswith('.edu'):
-            confidence += 15
-
-        # Boost if we have a name
-        if contact.get('name'):
-            confidence += 10
-
-        # Boost if we have a title
-        if contact.get('title'):
-            confidence += 15
+        # Reject bad domains from the cache before running the full validator
+        local, _, domain = email.partition('@')
+        if not local or not _validate_domain(domain):
+            return None
 
-        # Check source URL quality
-        source_url = contact.get('source_url', '')
-        if school_keywords[0] in source_url.lower() if school_keywords else False:
-            confidence += 10
+        # Validate email format; simple ASCII addresses take the fast path
+        if len(local) > 64 or not _FAST_EMAIL_RE.match(email):
+            try:
+                valid = validate_email(email, check_deliverability=False)
+                email = valid.email
+            except EmailNotValidError:
+                return None
 
-        contact['confidence'] = min(confidence, 100)
+        # Calculate confidence score
+        confidence = score(
+            email.partition('@')[2],
+            bool(contact.get('name')),
+            bool(contact.get('title')),
+            contact.get('source_url', '').casefold()
+        )
+
+        contact['confidence'] = confidence
         contact['email'] = email
         contact['flagged'] = confidence < config.MIN_CONTACT_CONFIDENCE
 
         return contact
 
-    def _generate_generic_contacts(self, school_name: str, existing_count: int) -> List[Dict]:
+    def _generate_generic_contacts(self, school: SchoolKey, existing_count: int) -> List[Dict]:
         """
         Generate generic contact placeholders when real contacts can't be found.
 
@@ -207,9 +427,8 @@ CRITICAL:
         generic_contacts = []
         titles = ['Principal', 'Dean', 'Superintendent', 'Director']
 
-        # Generate domain from school name
-        school_slug = school_name.lower().replace(' ', '').replace('-', '')
-        generic_domain = f"{school_slug[:20]}.edu"
+        # Domain guessed from school name
+        generic_domain = school.domain_guess
 
         for i in range(existing_count, min(existing_count + 2, config.MAX_CONTACTS_PER_SCHOOL)):
             title = titles[i] if i < len(titles) else 'Administrator'
@@ -218,7 +437,7 @@ CRITICAL:
                 'name': None,
                 'title': title,
                 'source_url': '',
-                'school_name': school_name,
+                'school_name': school.raw,
                 'confidence': 40,  # Low confidence for generic contacts
                 'flagged': True  # Always flag generic contacts
             })
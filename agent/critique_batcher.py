@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+from .email_writer import EmailWriter
+
+
+class CritiqueBatcher:
+    """
+    Collects critique requests from concurrent workers and sends them to Claude together.
+
+    A worker's request waits until batch_size requests are pending or max_wait seconds
+    have passed since the first one, then the whole batch goes out in one call.
+    Emails the batch call leaves out are critiqued individually by their own worker.
+    """
+
+    def __init__(self, email_writer: EmailWriter, batch_size: int, max_wait: float):
+        self.email_writer = email_writer
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+        self.pending: List[Tuple[Dict, Dict, Future]] = []
+        # Bumped each time pending is taken, so a timer only flushes the batch it was started for
+        self.batch_id = 0
+
+    def critique(self, email: Dict, school_data: Dict) -> Dict:
+        """Critique one email as part of the next batch; blocks until its result is ready."""
+        future = Future()
+
+        with self.lock:
+            self.pending.append((email, school_data, future))
+            full = len(self.pending) >= self.batch_size
+            first = len(self.pending) == 1
+            batch_id = self.batch_id
+
+        if full:
+            self.flush()
+        elif first:
+            timer = threading.Timer(self.max_wait, self.flush, args=(batch_id,))
+            timer.daemon = True
+            timer.start()
+
+        critique = future.result()
+        if critique is None:
+            # Missing from the batch reply (or the batch call failed): critique it in this worker
+            critique = self.email_writer.critique_email(email, school_data)
+        return critique
+
+    def flush(self, batch_id: Optional[int] = None):
+        """
+        Send every pending request in one batch call.
+
+        Given a batch_id (from a timer), does nothing if that batch was already sent.
+        """
+        with self.lock:
+            if batch_id is not None and batch_id != self.batch_id:
+                return
+            batch, self.pending = self.pending, []
+            self.batch_id += 1
+
+        if not batch:
+            return
+
+        # A lone request is left to its worker, which critiques it with a single call
+        if len(batch) == 1:
+            batch[0][2].set_result(None)
+            return
+
+        try:
+            critiques = self.email_writer.critique_emails_batch(
+                [email for email, _, _ in batch],
+                [school_data for _, school_data, _ in batch],
+                fallback=False
+            )
+            for (_, _, future), critique in zip(batch, critiques):
+                future.set_result(critique)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
@@ -0,0 +1,34 @@
+import hashlib
+import json
+from typing import Dict, Optional
+import config
+from .shelf_cache import ShelfCache
+
+# Bump when the email or critique prompts change so stale emails are not reused
+PROMPT_VERSION = "v1"
+
+
+class EmailCache(ShelfCache):
+    """Persistent cache of validated emails keyed by template, school data, random number, and recipient."""
+
+    def __init__(self, cache_dir: str, ttl_seconds: int):
+        super().__init__(cache_dir, 'emails', ttl_seconds)
+
+    def school_key(self, template: str, school_data: Dict, random_number: int) -> str:
+        """Hash of everything about a school that shapes its emails, including the run's random number."""
+        # Underscore keys are pipeline bookkeeping (e.g. pre-researched contacts), not prompt input
+        school_items = sorted((k, v) for k, v in school_data.items() if not str(k).startswith('_'))
+        payload = json.dumps([config.MODEL, PROMPT_VERSION, template, school_items, random_number], default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def _key(self, school_key: str, contact: Dict) -> str:
+        payload = json.dumps([school_key, contact.get('name', ''), contact.get('title', ''), contact.get('bio', '')])
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def get(self, school_key: str, contact: Dict) -> Optional[Dict]:
+        """Return the cached result dict for a contact, or None on a miss or expired entry."""
+        return self.get_entry(self._key(school_key, contact))
+
+    def set(self, school_key: str, contact: Dict, result: Dict):
+        """Store a validated email result (EmailResult.to_dict()) for a contact."""
+        self.set_entry(self._key(school_key, contact), result)
@@ -1,59 +1,206 @@
+import csv
+import io
+import logging
+import queue
 import time
 import random
-from typing import Dict, List
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import config
+from .client import get_client
 from .contact_research import ContactResearcher
-from .email_writer import EmailWriter
+from .email_cache import EmailCache
+from .email_result import EmailResult
+from .email_writer import EmailWriter, PLACEHOLDER_CONTACT
+from .critique_batcher import CritiqueBatcher
 from .quality_control import QualityControl
+from .rate_limit import ANTHROPIC_LIMITER
+from .school_key import SchoolKey
+
+logger = logging.getLogger(__name__)
+
+# Column order of the Gmail-ready export
+EXPORT_COLUMNS = [
+    'Recipient Email', 'Recipient Name', 'School Name', 'Subject', 'Body',
+    'Confidence Score', 'Flags', 'Contact Title', 'Contact Confidence',
+    'Email Quality', 'Attempts'
+]
+
+# Characters of CSV text buffered per chunk when streaming an export
+CSV_CHUNK_SIZE = 64 * 1024
+
+# Retry feedback after Claude opens its reply by declining instead of writing the email
+REFUSAL_RETRY_FEEDBACK = (
+    "ISSUES TO FIX:\n"
+    "- The previous reply declined the task. Write the email now, following the template; "
+    "do not refuse, apologize, or add commentary."
+)
+
+
+@dataclass
+class _GenerationRun:
+    """State of one generate_emails_for_schools call, kept apart from other runs on the same generator."""
+
+    # In-flight contact lookups, so duplicate school rows share one web search
+    contact_futures: Dict[str, Future] = field(default_factory=dict)
+    contact_lock: threading.Lock = field(default_factory=threading.Lock)
+    # How often the deterministic gate skipped the LLM critique, to tune the band
+    critique_stats: Dict[str, int] = field(default_factory=lambda: {'run': 0, 'skipped': 0})
+    stats_lock: threading.Lock = field(default_factory=threading.Lock)
+    # Set by the caller to stop the run; schools not yet started are skipped
+    cancel_event: Optional[threading.Event] = None
+
+    def record_critique_decision(self, ran: bool):
+        """Count whether the deterministic gate ran or skipped the LLM critique."""
+        with self.stats_lock:
+            self.critique_stats['run' if ran else 'skipped'] += 1
 
 
 class EmailGenerator:
     """Main orchestrator for the email generation pipeline."""
 
     def __init__(self, anthropic_key: str, brave_key: str):
-        self.contact_researcher = ContactResearcher(brave_key, anthropic_key)
-        self.email_writer = EmailWriter(anthropic_key)
+        # One limiter shared by every worker so the combined request rate stays under the cap
+        self.rate_limiter = ANTHROPIC_LIMITER
+        # Process-wide client, so its keep-alive connection pool outlives this generator
+        self.anthropic_client = get_client(anthropic_key)
+        self.contact_researcher = ContactResearcher(
+            brave_key, anthropic_key, self.rate_limiter, self.anthropic_client
+        )
+        self.email_writer = EmailWriter(anthropic_key, self.rate_limiter, self.anthropic_client)
         self.quality_control = QualityControl()
+        self.email_cache = (
+            EmailCache(config.CACHE_DIR, config.EMAIL_CACHE_TTL_SECONDS)
+            if config.EMAIL_CACHE_ENABLED else None
+        )
+        self.critique_batcher = CritiqueBatcher(
+            self.email_writer, config.CRITIQUE_BATCH_SIZE, config.CRITIQUE_BATCH_WAIT
+        )
 
     def generate_emails_for_schools(
         self,
         schools: List[Dict],
         template: str,
-        progress_callback=None
+        progress_callback=None,
+        cancel_event: Optional[threading.Event] = None
     ) -> List[Dict]:
         """
         Generate emails for a list of schools.
 
+        Schools are processed concurrently on config.MAX_WORKERS threads;
+        results are returned in the same order as the input list. Schools
+        without pre-researched contacts are researched in batches on
+        config.MAX_RESEARCH_WORKERS threads and start generating as each batch lands.
+
         Args:
             schools: List of school data dictionaries
             template: Email template text
-            progress_callback: Optional callback function(school_idx, total, school_name, step, detail)
+            progress_callback: Optional callback function(school_idx, total, school_name, step, detail),
+                called from one thread at a time
+            cancel_event: Optional event that cancels the run when set; schools that have not
+                started by then get a 'Cancelled' error result
 
         Returns:
             List of generated email results
         """
-        results = []
         total = len(schools)
+        results = [None] * total
+        run = _GenerationRun(cancel_event=cancel_event)
+
+        if progress_callback:
+            # Workers report progress concurrently; serialize calls so callbacks need no locking
+            callback = progress_callback
+            callback_lock = threading.Lock()
+
+            def progress_callback(*args):
+                with callback_lock:
+                    callback(*args)
+
+        # Private generator for the per-school template numbers, so workers don't share the global one
+        rng = random.Random()
+
+        # Two stages with their own pools: web research for schools that need contacts, and
+        # email generation (whose critiques are batched across workers by CritiqueBatcher).
+        # A school moves to generation as soon as its research batch lands, so both run at once.
+        with ThreadPoolExecutor(max_workers=config.MAX_RESEARCH_WORKERS) as research_executor, \
+                ThreadPoolExecutor(max_workers=config.MAX_WORKERS) as executor:
+            futures = {}
+
+            def submit(idx: int, researched_contacts: Optional[List[Dict]] = None):
+                futures[executor.submit(
+                    self._process_school, schools[idx - 1], template, idx, total, progress_callback,
+                    researched_contacts, rng, run
+                )] = idx
+
+            # School name -> positions of the rows waiting on its research
+            waiting: Dict[str, List[int]] = {}
+            for idx, school_data in enumerate(schools, 1):
+                school_name = school_data.get('School name')
+                if school_name and not school_data.get('_preresearched_contacts'):
+                    waiting.setdefault(school_name, []).append(idx)
+                else:
+                    submit(idx)
+
+            researched_batches, batch_count = self._start_contact_research(list(waiting), research_executor)
+            for _ in range(batch_count):
+                batch, researched = researched_batches.get()
+                for school_name in batch:
+                    for idx in waiting[school_name]:
+                        submit(idx, researched.get(school_name))
+
+            for future in as_completed(futures):
+                idx = futures[future]
+                school_name = schools[idx - 1].get('School name', f'School {idx}')
+
+                try:
+                    results[idx - 1] = future.result()
+                except Exception as e:
+                    logger.error("Error processing %s: %s", school_name, e)
+                    if progress_callback:
+                        progress_callback(idx, total, school_name, "error", str(e))
+                    results[idx - 1] = {
+                        'school_name': school_name,
+                        'error': str(e),
+                        'emails': []
+                    }
+
+        checked = run.critique_stats['run'] + run.critique_stats['skipped']
+        if checked:
+            logger.info("Self-critique skipped for %d/%d deterministic checks", run.critique_stats['skipped'], checked)
+
+        return results
+
+    def _start_contact_research(
+        self,
+        school_names: List[str],
+        executor: ThreadPoolExecutor
+    ) -> Tuple[queue.Queue, int]:
+        """
+        Research schools several per web search call, in the background.
 
-        for idx, school_data in enumerate(schools, 1):
-            school_name = school_data.get('School name', f'School {idx}')
+        Returns:
+            A queue that receives (batch school names, {school name: contacts}) as each
+            batch finishes, and the number of batches to wait for
+        """
+        batch_size = config.CONTACT_BATCH_SIZE
+        batches = [school_names[i:i + batch_size] for i in range(0, len(school_names), batch_size)]
+        done = queue.Queue()
 
+        def research(batch: List[str]):
             try:
-                school_result = self._process_school(
-                    school_data, template, idx, total, progress_callback
-                )
-                results.append(school_result)
+                researched = self.contact_researcher.research_contacts_batch(batch)
             except Exception as e:
-                print(f"Error processing {school_name}: {str(e)}")
-                if progress_callback:
-                    progress_callback(idx, total, school_name, "error", str(e))
-                results.append({
-                    'school_name': school_name,
-                    'error': str(e),
-                    'emails': []
-                })
+                # Schools left out here are researched one at a time in _process_school
+                logger.error("Error researching contact batch: %s", e)
+                researched = {}
+            done.put((batch, researched))
 
-        return results
+        for batch in batches:
+            executor.submit(research, batch)
+
+        return done, len(batches)
 
     def _process_school(
         self,
@@ -61,37 +208,53 @@ class EmailGenerator:
         template: str,
         school_idx: int = 1,
         total_schools: int = 1,
-        progress_callback=None
+        progress_callback=None,
+        researched_contacts: Optional[List[Dict]] = None,
+        rng: Optional[random.Random] = None,
+        run: Optional[_GenerationRun] = None
     ) -> Dict:
         """Process a single school through the full pipeline."""
+        run = run or _GenerationRun()
         school_name = school_data.get('School name', 'Unknown School')
 
+        if run.cancel_event is not None and run.cancel_event.is_set():
+            return {
+                'school_name': school_name,
+                'error': 'Cancelled',
+                'emails': []
+            }
+
         def update_progress(step: str, detail: str = ""):
             if progress_callback:
                 progress_callback(school_idx, total_schools, school_name, step, detail)
 
         # Generate random number (3-5) for this school - MUST be consistent across all contacts
-        random_number = random.randint(3, 5)
-        print(f"  Using random number {random_number} for all contacts at {school_name}")
+        random_number = (rng or random).randint(3, 5)
+        # The number is part of the cache key, so a rerun that draws a different number writes fresh emails
+        school_cache_key = self.email_cache.school_key(template, school_data, random_number) if self.email_cache else None
+        logger.info("  Using random number %d for all contacts at %s", random_number, school_name)
 
-        # Add to school data so it's available in email generation
-        school_data_with_number = school_data.copy()
-        school_data_with_number['_random_number_for_template'] = random_number
+        # Accuracy-check facts shared by every email for this school
+        school_ctx = QualityControl.precompute_school_ctx(school_data)
 
         # Step 1: Get contacts (use pre-researched if available, else do web search)
         if '_preresearched_contacts' in school_data and school_data['_preresearched_contacts']:
             # Use contacts from CSV
             contacts = school_data['_preresearched_contacts']
-            print(f"  Using {len(contacts)} pre-researched contacts from CSV")
+            logger.info("  Using %d pre-researched contacts from CSV", len(contacts))
             update_progress("found_contacts", f"Using {len(contacts)} pre-researched contacts")
+        elif researched_contacts:
+            # Already found by the batched web search
+            contacts = researched_contacts
+            update_progress("found_contacts", f"Found {len(contacts)} contacts")
         else:
             # Fall back to web search
             update_progress("searching", "Finding contacts via web search...")
-            print(f"  Researching contacts for {school_name}...")
-            contacts = self.contact_researcher.research_contacts(school_name, school_data)
+            logger.info("  Researching contacts for %s...", school_name)
+            contacts = self._get_contacts(school_name, school_data, run)
 
             if not contacts:
-                print(f"  ⚠️  No contacts found for {school_name}")
+                logger.warning("  ⚠️  No contacts found for %s", school_name)
                 update_progress("warning", "No contacts found")
                 return {
                     'school_name': school_name,
@@ -103,24 +266,51 @@ class EmailGenerator:
 
             update_progress("found_contacts", f"Found {len(contacts)} contacts")
 
-        # Step 2: Generate email for each contact (using same random number)
-        emails = []
-        for contact_idx, contact in enumerate(contacts, 1):
+        # Step 2: Generate email for each contact (using same random number).
+        # Contacts are independent, so their Claude calls run in parallel.
+        def generate_for_contact(contact_idx: int, contact: Dict) -> EmailResult:
             contact_name = contact.get('name') or contact.get('email')
             contact_email = contact.get('email', 'NO_EMAIL')
             update_progress("generating", f"Writing email {contact_idx}/{len(contacts)} for {contact_name}")
-            print(f"  Generating email for {contact_name} ({contact_email}) at {school_name}")
+            logger.info("  Generating email for %s (%s) at %s", contact_name, contact_email, school_name)
 
             email_result = self._generate_and_validate_email(
-                template, school_data_with_number, contact
+                template, school_data, contact, random_number, school_ctx, school_cache_key, run
             )
 
             # DEBUG: Verify the email result has correct contact info
-            result_email = email_result.get('email', {}).get('recipient_email', 'UNKNOWN')
+            result_email = email_result.email.get('recipient_email', 'UNKNOWN')
             if result_email != contact_email:
-                print(f"  ⚠️ EMAIL MISMATCH: Expected {contact_email}, got {result_email}")
+                logger.warning("  ⚠️ EMAIL MISMATCH: Expected %s, got %s", contact_email, result_email)
+
+            return email_result
+
+        # Contacts without a bio would get the same email apart from name and title,
+        # so one shared email is written for them and personalized per contact
+        shared = set()
+        if config.SHARE_EMAIL_ACROSS_CONTACTS:
+            shared = {i for i, contact in enumerate(contacts) if not contact.get('bio')}
+            if len(shared) < 2:
+                shared = set()
+
+        def generate_shared() -> EmailResult:
+            update_progress("generating", f"Writing one shared email for {len(shared)} contacts")
+            logger.info("  Generating shared email for %d contacts at %s", len(shared), school_name)
+            return self._generate_and_validate_email(
+                template, school_data, PLACEHOLDER_CONTACT, random_number, school_ctx, school_cache_key, run
+            )
 
-            emails.append(email_result)
+        with ThreadPoolExecutor(max_workers=min(len(contacts), config.MAX_CONTACT_WORKERS)) as contact_executor:
+            shared_future = contact_executor.submit(generate_shared) if shared else None
+            individual = {
+                i: contact_executor.submit(generate_for_contact, i + 1, contact)
+                for i, contact in enumerate(contacts) if i not in shared
+            }
+
+            emails = [
+                self._personalize_result(shared_future.result(), contact) if i in shared else individual[i].result()
+                for i, contact in enumerate(contacts)
+            ]
 
         update_progress("complete", f"Generated {len(emails)} emails")
 
@@ -131,6 +321,43 @@ class EmailGenerator:
             'emails': emails
         }
 
+    def _personalize_result(self, shared_result: EmailResult, contact: Dict) -> EmailResult:
+        """Turn a result written for another contact (the shared school email, or a cached run) into this contact's result."""
+        final_confidence = shared_result.final_confidence
+        if shared_result.status == 'success':
+            final_confidence = self._calculate_final_confidence(
+                shared_result.quality['quality_score'],
+                contact.get('confidence', 50)
+            )
+
+        return EmailResult(
+            contact=contact,
+            email=self.email_writer.personalize_email(shared_result.email, contact),
+            quality=shared_result.quality,
+            critique=shared_result.critique,
+            attempts=shared_result.attempts,
+            final_confidence=final_confidence,
+            status=shared_result.status,
+            flagged=shared_result.flagged or contact.get('flagged', False)
+        )
+
+    def _get_contacts(self, school_name: str, school_data: Dict, run: _GenerationRun) -> List[Dict]:
+        """Research contacts once per school name in a run, sharing the result with concurrent duplicates."""
+        with run.contact_lock:
+            future = run.contact_futures.get(school_name)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                run.contact_futures[school_name] = future
+
+        if is_owner:
+            try:
+                future.set_result(self.contact_researcher.research_contacts(school_name, school_data))
+            except Exception as e:
+                future.set_exception(e)
+
+        return future.result()
+
     def _quick_quality_check(self, email: Dict, contact: Dict) -> bool:
         """Fast local check to see if email looks good enough to skip expensive critique."""
         body = email.get('body', '')
@@ -167,10 +394,8 @@ class EmailGenerator:
             return False
 
         # Should not contain refusal language
-        refusal_phrases = ['I cannot write', 'I need to flag', 'PROBLEM:', 'CRITICAL ISSUE', 'What I need']
-        for phrase in refusal_phrases:
-            if phrase in body:
-                return False
+        if self.quality_control.scan_phrases(body)['refusal']:
+            return False
 
         return True
 
@@ -178,9 +403,38 @@ class EmailGenerator:
         self,
         template: str,
         school_data: Dict,
-        contact: Dict
-    ) -> Dict:
+        contact: Dict,
+        random_number: int = 3,
+        school_ctx: Optional[Dict] = None,
+        school_cache_key: Optional[str] = None,
+        run: Optional[_GenerationRun] = None
+    ) -> EmailResult:
+        """Generate and validate a single email, reusing a cached result from an earlier run if there is one."""
+        if school_cache_key:
+            cached = self.email_cache.get(school_cache_key, contact)
+            if cached is not None:
+                logger.info("    Using cached email for %s", contact.get('name') or contact.get('email'))
+                return self._personalize_result(EmailResult(**cached), contact)
+
+        result = self._generate_with_retries(template, school_data, contact, random_number, school_ctx, run)
+
+        # Only keep emails that passed validation; errors and failures are worth another try next run
+        if school_cache_key and result.status == 'success':
+            self.email_cache.set(school_cache_key, contact, result.to_dict())
+
+        return result
+
+    def _generate_with_retries(
+        self,
+        template: str,
+        school_data: Dict,
+        contact: Dict,
+        random_number: int = 3,
+        school_ctx: Optional[Dict] = None,
+        run: Optional[_GenerationRun] = None
+    ) -> EmailResult:
         """Generate and validate a single email with retry logic."""
+        run = run or _GenerationRun()
         attempt = 0
         retry_feedback = None
         max_retries = 1  # Reduced from config.MAX_RETRIES for speed
@@ -190,22 +444,27 @@ class EmailGenerator:
 
             # Generate email
             email = self.email_writer.generate_email(
-                template, school_data, contact, retry_feedback
+                template, school_data, contact, retry_feedback, random_number
             )
 
+            if email.get('refused') and attempt <= max_retries:
+                logger.info("    Claude declined to write the email, retrying with feedback...")
+                retry_feedback = REFUSAL_RETRY_FEEDBACK
+                continue
+
             if email.get('error'):
-                return {
-                    'contact': contact,
-                    'email': email,
-                    'quality': None,
-                    'critique': None,
-                    'attempts': attempt,
-                    'status': 'error'
-                }
+                return EmailResult(
+                    contact=contact,
+                    email=email,
+                    quality=None,
+                    critique=None,
+                    attempts=attempt,
+                    status='error'
+                )
 
             # SPEED OPTIMIZATION: Skip expensive critique if email passes quick check
             if self._quick_quality_check(email, contact):
-                print(f"    ✓ Email passed quick quality check, skipping critique")
+                logger.info("    ✓ Email passed quick quality check, skipping critique")
                 quality = {
                     'quality_score': 85,
                     'needs_retry': False,
@@ -219,23 +478,32 @@ class EmailGenerator:
                     contact.get('confidence', 50)
                 )
 
-                return {
-                    'contact': contact,
-                    'email': email,
-                    'quality': quality,
-                    'critique': critique,
-                    'attempts': attempt,
-                    'final_confidence': final_confidence,
-                    'status': 'success',
-                    'flagged': contact.get('flagged', False)
-                }
+                return EmailResult(
+                    contact=contact,
+                    email=email,
+                    quality=quality,
+                    critique=critique,
+                    attempts=attempt,
+                    final_confidence=final_confidence,
+                    status='success',
+                    flagged=contact.get('flagged', False)
+                )
 
-            # Full self-critique (only if quick check failed)
-            print(f"    Running full critique...")
-            critique = self.email_writer.critique_email(email, school_data)
+            # Deterministic quality validation first; the LLM critic is only consulted
+            # when the score is borderline, since clear passes and clear failures
+            # don't need a second opinion
+            quality = self.quality_control.validate_email(email, school_data, critique=None, school_ctx=school_ctx)
+            critique = None
 
-            # Quality validation
-            quality = self.quality_control.validate_email(email, school_data, critique)
+            band_low = config.MIN_CONFIDENCE_SCORE - config.CRITIQUE_BAND_BELOW
+            band_high = config.MIN_CONFIDENCE_SCORE + config.CRITIQUE_BAND_ABOVE
+            run_critique = band_low <= quality['quality_score'] < band_high
+            run.record_critique_decision(run_critique)
+
+            if run_critique:
+                logger.info("    Borderline quality score %d, running critique...", quality['quality_score'])
+                critique = self.critique_batcher.critique(email, school_data)
+                quality = self.quality_control.validate_email(email, school_data, critique, school_ctx)
 
             # Check if we need to retry
             if not quality['needs_retry'] or attempt > max_retries:
@@ -245,48 +513,48 @@ class EmailGenerator:
                     contact.get('confidence', 50)
                 )
 
-                return {
-                    'contact': contact,
-                    'email': email,
-                    'quality': quality,
-                    'critique': critique,
-                    'attempts': attempt,
-                    'final_confidence': final_confidence,
-                    'status': 'success',
-                    'flagged': quality['needs_human_review'] or contact.get('flagged', False)
-                }
+                return EmailResult(
+                    contact=contact,
+                    email=email,
+                    quality=quality,
+                    critique=critique,
+                    attempts=attempt,
+                    final_confidence=final_confidence,
+                    status='success',
+                    flagged=quality['needs_human_review'] or contact.get('flagged', False)
+                )
 
             # Generate feedback for retry (no delay for speed)
-            print(f"    Quality score {quality['quality_score']} below threshold, retrying...")
+            logger.info("    Quality score %d below threshold, retrying...", quality['quality_score'])
             retry_feedback = self.quality_control.generate_retry_feedback(quality, critique)
 
         # Should not reach here, but just in case
-        return {
-            'contact': contact,
-            'email': email,
-            'quality': quality,
-            'critique': critique,
-            'attempts': attempt,
-            'final_confidence': 0,
-            'status': 'failed',
-            'flagged': True
-        }
+        return EmailResult(
+            contact=contact,
+            email=email,
+            quality=quality,
+            critique=critique,
+            attempts=attempt,
+            final_confidence=0,
+            status='failed',
+            flagged=True
+        )
 
     def _calculate_final_confidence(self, email_quality: int, contact_confidence: int) -> int:
         """Calculate final confidence score combining email and contact quality."""
         # Weight: 60% email quality, 40% contact confidence
         return int(email_quality * 0.6 + contact_confidence * 0.4)
 
-    def format_results_for_export(self, results: List[Dict]) -> List[Dict]:
+    def format_results_for_export(self, results: List[Dict]) -> Iterator[Dict]:
         """
         Format results into CSV-ready format for Gmail import.
 
+        Rows are yielded one at a time; wrap in list() where a list is needed.
+
         Returns:
-            List of dictionaries with columns: Recipient Email, Recipient Name,
+            Iterator of dictionaries with columns: Recipient Email, Recipient Name,
             School Name, Subject, Body, Confidence Score, Flags
         """
-        export_rows = []
-
         for school_result in results:
             school_name = school_result['school_name']
 
@@ -295,45 +563,80 @@ class EmailGenerator:
                 continue
 
             for email_result in school_result['emails']:
-                email = email_result.get('email', {})
-                contact = email_result.get('contact', {})
-                quality = email_result.get('quality', {})
+                email_get = email_result.email.get
+                contact_get = email_result.contact.get
+                quality = email_result.quality
 
                 # Collect flags
                 flags = []
-                if email_result.get('flagged'):
+                if email_result.flagged:
                     flags.append('NEEDS_REVIEW')
-                if contact.get('flagged'):
+                if contact_get('flagged'):
                     flags.append('UNCERTAIN_CONTACT')
                 if quality and quality.get('flags'):
                     flags.extend(quality['flags'])
 
                 # VALIDATION: Check that email domain reasonably matches school
-                recipient_email = email.get('recipient_email', '')
+                recipient_email = email_get('recipient_email', '')
                 if recipient_email and '@' in recipient_email:
                     email_domain = recipient_email.split('@')[1].lower()
-                    school_lower = school_name.lower()
                     # Check if any significant word from school name appears in email domain
-                    school_words = [w for w in school_lower.replace("'", "").split() if len(w) > 3 and w not in ['school', 'academy', 'prep', 'the', 'of']]
+                    school_words = SchoolKey.from_raw(school_name).domain_keywords
                     domain_match = any(word in email_domain for word in school_words)
                     if not domain_match:
-                        print(f"⚠️  DOMAIN MISMATCH: School '{school_name}' has contact with email '{recipient_email}'")
+                        logger.warning("⚠️  DOMAIN MISMATCH: School '%s' has contact with email '%s'", school_name, recipient_email)
                         flags.append('DOMAIN_MISMATCH')
 
-                row = {
+                yield {
                     'Recipient Email': recipient_email,
-                    'Recipient Name': email.get('recipient_name', ''),
+                    'Recipient Name': email_get('recipient_name', ''),
                     'School Name': school_name,
-                    'Subject': email.get('subject', ''),
-                    'Body': email.get('body', ''),
-                    'Confidence Score': email_result.get('final_confidence', 0),
-                    'Flags': ', '.join(flags) if flags else '',
-                    'Contact Title': contact.get('title', ''),
-                    'Contact Confidence': contact.get('confidence', 0),
+                    'Subject': email_get('subject', ''),
+                    'Body': email_get('body', ''),
+                    'Confidence Score': email_result.final_confidence,
+                    # dict.fromkeys drops repeats but keeps the order flags were added in
+                    'Flags': ', '.join(dict.fromkeys(flags)),
+                    'Contact Title': contact_get('title', ''),
+                    'Contact Confidence': contact_get('confidence', 0),
                     'Email Quality': quality.get('quality_score', 0) if quality else 0,
-                    'Attempts': email_result.get('attempts', 1)
+                    'Attempts': email_result.attempts
                 }
 
-                export_rows.append(row)
+    @staticmethod
+    def serialize_results(results: List[Dict]) -> List[Dict]:
+        """Convert EmailResult objects in school results to dicts for JSON session storage."""
+        return [
+            {**school_result, 'emails': [email_result.to_dict() for email_result in school_result.get('emails', [])]}
+            for school_result in results
+        ]
 
-        return export_rows
+    @staticmethod
+    def iter_csv(export_rows: Iterable[Dict]) -> Iterator[str]:
+        """
+        Yield export rows (from format_results_for_export) as Gmail-ready CSV text,
+        in chunks of about CSV_CHUNK_SIZE characters.
+
+        For streaming a download straight into an HTTP response without a file on disk;
+        rows are buffered so the server writes a few large chunks rather than one per row.
+        """
+        buf = io.StringIO()
+        writer = csv.DictWriter(
+            buf,
+            fieldnames=EXPORT_COLUMNS,
+            restval='',
+            extrasaction='ignore',  # Session rows may carry extra keys from review edits
+            quoting=csv.QUOTE_ALL,  # Quote all fields to preserve newlines and special chars
+            escapechar='\\',
+            lineterminator='\n'
+        )
+
+        writer.writeheader()
+        for row in export_rows:
+            writer.writerow(row)
+            if buf.tell() >= CSV_CHUNK_SIZE:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+
+        if buf.tell():
+            yield buf.getvalue()
@@ -0,0 +1,20 @@
+from dataclasses import dataclass, fields
+from typing import Dict, Optional
+
+
+@dataclass(slots=True)
+class EmailResult:
+    """Outcome of generating and validating one email for one contact."""
+
+    contact: Dict
+    email: Dict
+    quality: Optional[Dict]
+    critique: Optional[Dict]
+    attempts: int
+    final_confidence: int = 0
+    status: str = 'unknown'
+    flagged: bool = False
+
+    def to_dict(self) -> Dict:
+        """Plain dict form, for JSON session storage."""
+        return {field.name: getattr(self, field.name) for field in fields(self)}
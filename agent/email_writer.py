@@ -1,20 +1,189 @@
+import json
+import logging
+import re
+from functools import lru_cache
 from anthropic import Anthropic
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import config
+from .client import get_client
+from .quality_control import REFUSAL_PHRASES
+from .rate_limit import RateLimiter, create_message, stream_message
+
+logger = logging.getLogger(__name__)
+
+# Response parsers, compiled once. Each section runs from its label to the next label
+# (or the end of the text), so a whole response is read in a single pass.
+_EMAIL_RE = re.compile(r'^(SUBJECT|BODY):[ \t]*(.*?)(?=^(?:SUBJECT|BODY):|\Z)', re.M | re.S)
+_CRITIQUE_LABELS = 'ISSUES|TONE_SCORE|ACCURACY_SCORE|OVERALL_SCORE|SUGGESTIONS'
+_CRITIQUE_RE = re.compile(
+    rf'^[ \t*-]*({_CRITIQUE_LABELS}):[ \t*]*(.*?)(?=^[ \t*-]*(?:{_CRITIQUE_LABELS}):|\Z)',
+    re.M | re.S
+)
+_LEADING_INT_RE = re.compile(r'\d+')
+
+# What the critic checks, shared by the single and batch critique prompts
+_CRITIQUE_CHECKS = """1. Tone issues (disrespectful, too blunt, overly casual)
+2. Factual accuracy (do details match school data?)
+3. Professionalism (appropriate for student founder to administrator)
+4. Clarity and conciseness"""
+
+# School columns the critic checks facts against
+CRITIQUE_SCHOOL_FIELDS = ('School name', 'Tuition', 'Pain signal', 'Enrollment', 'Why good fit')
+# Longer bodies are already failing the length check; the critic only sees this much of them
+CRITIQUE_MAX_BODY_WORDS = 600
+
+# Refusals show up in the opening lines, so generation is abandoned if they appear this early
+REFUSAL_CHECK_CHARS = 200
+
+# Recipient placeholder for one email shared by several contacts at a school.
+# The shared email never names the recipient's role, so only the greeting is filled in per contact.
+FIRST_NAME_PLACEHOLDER = '{{FIRST_NAME}}'
+PLACEHOLDER_CONTACT = {
+    'name': FIRST_NAME_PLACEHOLDER,
+    'title': '',
+    'confidence': 100,
+    '_placeholder': True
+}
+
+# Whatever greeting the model put before the placeholder ("Hi", "Dear", "Hello", ...), for contacts without a name
+_PLACEHOLDER_GREETING_RE = re.compile(
+    r'\b(?:hi|hello|hey|dear|greetings|good (?:morning|afternoon|evening))[ \t]+' + re.escape(FIRST_NAME_PLACEHOLDER),
+    re.I
+)
+# Any other use of the placeholder, with the comma or space that set it off
+_STRAY_PLACEHOLDER_RE = re.compile(r',?[ \t]*' + re.escape(FIRST_NAME_PLACEHOLDER))
+# Doctorates in a title or name suffix; the greeting then uses "Dr. LastName"
+_DOCTORATE_RE = re.compile(r'\b(?:ph\.?\s?d|ed\.?\s?d|doctor|dr)\b', re.I)
+
+
+def _opens_with_refusal(text: str) -> bool:
+    """True if the start of a reply is Claude declining or flagging instead of writing the email."""
+    return any(phrase in text for phrase in REFUSAL_PHRASES)
+
+
+def _has_real_name(name: str) -> bool:
+    """True unless the contact name is missing or a generic placeholder like 'Administrator'."""
+    return bool(name) and name.lower() not in ['administrator', 'admin', 'unknown', 'n/a', '']
+
+
+def _salutation_name(contact: Dict) -> Optional[str]:
+    """
+    How the greeting addresses a contact, following the prompt's GREETING FORMAT:
+    "Dr. LastName" for doctorates, otherwise the first name. None for generic contacts.
+    """
+    name = (contact.get('name') or '').strip()
+    if not _has_real_name(name):
+        return None
+
+    # "Sarah Johnson, PhD" -> "Sarah Johnson"; "Dr. Sarah Johnson" -> "Sarah Johnson"
+    base, _, suffix = name.partition(',')
+    parts = base.split()
+    has_prefix = bool(parts) and parts[0].lower().rstrip('.') == 'dr'
+    if has_prefix:
+        parts = parts[1:]
+    if not parts:
+        return None
+
+    is_doctor = has_prefix or _DOCTORATE_RE.search(suffix) or _DOCTORATE_RE.search(contact.get('title') or '')
+    if is_doctor and len(parts) > 1:
+        return f"Dr. {parts[-1]}"
+    return parts[0]
+
+
+# Instructions, template, and output format: the same for every email, so cached per template
+_FIXED_PROMPT = """You are writing a cold outreach email on behalf of a student founder from Theo, an agentic teaching assistant platform (https://trytheo.org).
+
+CRITICAL REQUIREMENTS:
+1. Be respectful and professional - you are a student reaching out to senior administrators
+2. Use accurate information only - do not hallucinate or make up details
+3. Follow the template structure and guidelines exactly
+4. Maintain a humble, earnest student founder tone
+5. Keep the email concise and focused
+6. YOU MUST ALWAYS WRITE THE EMAIL - never refuse or explain why you can't write it
+
+GREETING FORMAT:
+- If you have a real name (like "Sarah Johnson"): Use "Hi Sarah," (first name only)
+- If the person has a PhD or doctorate in their title: Use "Hi Dr. [LastName],"
+- If the name is "Administrator" or generic: Use "Hi there," as a fallback - DO NOT refuse to write the email
+
+TEMPLATE AND GUIDELINES:
+{template}
+
+Format your response as:
+
+SUBJECT: [Your subject line]
+
+BODY:
+[Your email body]
+
+ABSOLUTELY DO NOT:
+- Refuse to write the email
+- Explain why you can't write the email
+- Ask for more information
+- Output anything other than SUBJECT: and BODY:"""
+
+# Per-email part of the prompt; {retry_block} is filled in once below for the two variants
+_VARIABLE_PROMPT_BASE = """IMPORTANT: {name_instruction}
+
+SCHOOL INFORMATION:
+{school_info}
+
+RECIPIENT:
+- Name: {contact_name}
+- Title: {contact_title}
+- School: {school_name}
+{background_line}
+
+PERSONALIZATION GUIDANCE:
+{personalization}
+
+IMPORTANT - CONSISTENT NUMBER FOR THIS SCHOOL:
+Use the number {random_number} wherever the template requires a random number (e.g., "X teachers are in schools similar to...").
+ALL emails for this school MUST use {random_number} - this is non-negotiable.
+
+{retry_block}
+
+Generate a personalized cold outreach email in the SUBJECT:/BODY: format above. Just write the best email you can with the information provided."""
+_VARIABLE_PROMPT = _VARIABLE_PROMPT_BASE.replace("{retry_block}", "")
+_VARIABLE_PROMPT_RETRY = _VARIABLE_PROMPT_BASE.replace(
+    "{retry_block}", "FEEDBACK FROM PREVIOUS ATTEMPT (address these issues):{retry_feedback}"
+)
+
+_BIO_GUIDANCE = "Use the recipient's background to personalize the P.S. Reference relevant experience like prior schools, EdTech adoption, gifted programs, or academic credentials to find a genuine connection."
+_SCHOOL_GUIDANCE = "Focus on the school's positive attributes and initiatives from the data above."
+
+
+@lru_cache(maxsize=16)
+def _fixed_prompt(template: str) -> str:
+    """The cached first prompt block for a template."""
+    return _FIXED_PROMPT.format(template=template)
+
+
+@lru_cache(maxsize=256)
+def _format_school_info(school_items: Tuple[Tuple[str, str], ...]) -> str:
+    """Render school data as the '- key: value' block used in prompts; shared by every contact at a school."""
+    return "\n".join(f"- {key}: {value}" for key, value in school_items)
+
+
+def _school_info(school_data: Dict) -> str:
+    """Cached school_info block for a school's data (values stringified so they can be hashed)."""
+    return _format_school_info(tuple((key, str(value)) for key, value in school_data.items()))
 
 
 class EmailWriter:
     """Generates personalized emails using Claude API."""
 
-    def __init__(self, api_key: str):
-        self.client = Anthropic(api_key=api_key)
+    def __init__(self, api_key: str, rate_limiter: Optional[RateLimiter] = None, client: Optional[Anthropic] = None):
+        self.client = client or get_client(api_key)
+        self.rate_limiter = rate_limiter
 
     def generate_email(
         self,
         template: str,
         school_data: Dict,
         contact: Dict,
-        retry_feedback: str = None
+        retry_feedback: str = None,
+        random_number: int = 3
     ) -> Dict:
         """
         Generate a personalized email for a contact.
@@ -24,21 +193,40 @@ class EmailWriter:
             school_data: School information (name, tuition, pain points, etc.)
             contact: Contact information (name, email, title)
             retry_feedback: Optional feedback from quality control for retry
+            random_number: Number the template's "X teachers..." line uses for this school
 
         Returns:
             Dict with subject, body, and metadata
         """
-        prompt = self._build_prompt(template, school_data, contact, retry_feedback)
+        prompt = self._build_prompt(template, school_data, contact, retry_feedback, random_number)
 
         try:
-            response = self.client.messages.create(
+            # Streamed so a reply that opens with a refusal is cut off instead of run to max_tokens
+            response = stream_message(
+                self.client, self.rate_limiter,
+                abort_check=_opens_with_refusal,
+                abort_check_chars=REFUSAL_CHECK_CHARS,
                 model=config.MODEL,
                 max_tokens=config.MAX_TOKENS,
                 temperature=config.TEMPERATURE,
                 messages=[{"role": "user", "content": prompt}]
             )
 
-            content = response.content[0].text
+            content = ''.join(block.text for block in response.content if getattr(block, 'text', None))
+
+            if _opens_with_refusal(content[:REFUSAL_CHECK_CHARS]):
+                logger.warning("Claude declined to write the email for %s, stopped generation early", school_data.get('School name', ''))
+                return {
+                    'subject': '',
+                    'body': '',
+                    'error': 'Claude declined to write this email',
+                    # Retryable: the caller regenerates with feedback instead of giving up
+                    'refused': True,
+                    'raw_response': content,
+                    'recipient_email': contact.get('email'),
+                    'recipient_name': contact.get('name'),
+                    'school_name': school_data.get('School name', '')
+                }
 
             # Parse the response into subject and body
             email_parts = self._parse_email_response(content)
@@ -54,7 +242,7 @@ class EmailWriter:
             }
 
         except Exception as e:
-            print(f"Error generating email: {str(e)}")
+            logger.error("Error generating email: %s", e)
             return {
                 'subject': '',
                 'body': '',
@@ -69,112 +257,90 @@ class EmailWriter:
         template: str,
         school_data: Dict,
         contact: Dict,
-        retry_feedback: str = None
-    ) -> str:
-        """Build the prompt for Claude."""
+        retry_feedback: str = None,
+        random_number: int = 3
+    ) -> List[Dict]:
+        """
+        Build the prompt for Claude as two content blocks.
+
+        The first block (instructions + template) is identical for every email in a
+        batch and is marked for Anthropic prompt caching; the second holds the
+        school, recipient, and retry feedback that change per call.
+        """
+        fixed_part = _fixed_prompt(template)
 
         # Format school data
-        school_info = "\n".join([f"- {key}: {value}" for key, value in school_data.items()])
+        school_info = _school_info(school_data)
 
         # Format contact info
         contact_name = contact.get('name') or 'Administrator'
         contact_title = contact.get('title') or 'Administrator'
         contact_bio = contact.get('bio', '')
 
-        # Extract random number if provided
-        random_number = school_data.get('_random_number_for_template', 3)
-
         # Check if we have a real name or a placeholder
-        has_real_name = contact_name and contact_name.lower() not in ['administrator', 'admin', 'unknown', 'n/a', '']
-
-        prompt = f"""You are writing a cold outreach email on behalf of a student founder from Theo, an agentic teaching assistant platform (https://trytheo.org).
-
-CRITICAL REQUIREMENTS:
-1. Be respectful and professional - you are a student reaching out to senior administrators
-2. Use accurate information only - do not hallucinate or make up details
-3. Follow the template structure and guidelines exactly
-4. Maintain a humble, earnest student founder tone
-5. Keep the email concise and focused
-6. YOU MUST ALWAYS WRITE THE EMAIL - never refuse or explain why you can't write it
-
-GREETING FORMAT:
-- If you have a real name (like "Sarah Johnson"): Use "Hi Sarah," (first name only)
-- If the person has a PhD or doctorate in their title: Use "Hi Dr. [LastName],"
-- If the name is "Administrator" or generic: Use "Hi there," as a fallback - DO NOT refuse to write the email
-
-IMPORTANT: {"You have a real name to use: " + contact_name if has_real_name else "The contact name is generic/missing. Use 'Hi there,' as the greeting and write the email anyway. The email will be flagged for review."}
-
-TEMPLATE AND GUIDELINES:
-{template}
-
-SCHOOL INFORMATION:
-{school_info}
-
-RECIPIENT:
-- Name: {contact_name}
-- Title: {contact_title}
-- School: {school_data.get('School name', '')}
-{f"- Background: {contact_bio}" if contact_bio else ""}
-
-PERSONALIZATION GUIDANCE:
-{f"Use the recipient's background to personalize the P.S. Reference relevant experience like prior schools, EdTech adoption, gifted programs, or academic credentials to find a genuine connection." if contact_bio else "Focus on the school's positive attributes and initiatives from the data above."}
-
-IMPORTANT - CONSISTENT NUMBER FOR THIS SCHOOL:
-Use the number {random_number} wherever the template requires a random number (e.g., "X teachers are in schools similar to...").
-ALL emails for this school MUST use {random_number} - this is non-negotiable.
-
-{f"FEEDBACK FROM PREVIOUS ATTEMPT (address these issues):{retry_feedback}" if retry_feedback else ""}
-
-Generate a personalized cold outreach email. Format your response as:
-
-SUBJECT: [Your subject line]
-
-BODY:
-[Your email body]
-
-ABSOLUTELY DO NOT:
-- Refuse to write the email
-- Explain why you can't write the email
-- Ask for more information
-- Output anything other than SUBJECT: and BODY:
-
-Just write the best email you can with the information provided."""
-
-        return prompt
+        if contact.get('_placeholder'):
+            name_instruction = (
+                f"This email will be sent to several administrators at this school. "
+                f"Greet with exactly 'Hi {FIRST_NAME_PLACEHOLDER},' keeping the placeholder verbatim; it is filled in per recipient. "
+                f"Do not mention the recipient's name or job title anywhere else."
+            )
+        elif _has_real_name(contact_name):
+            name_instruction = "You have a real name to use: " + contact_name
+        else:
+            name_instruction = "The contact name is generic/missing. Use 'Hi there,' as the greeting and write the email anyway. The email will be flagged for review."
+
+        # The retry template is only used for the (uncommon) second attempt
+        prompt_template = _VARIABLE_PROMPT_RETRY if retry_feedback else _VARIABLE_PROMPT
+        variable_part = prompt_template.format_map({
+            'name_instruction': name_instruction,
+            'school_info': school_info,
+            'contact_name': contact_name,
+            'contact_title': contact_title,
+            'school_name': school_data.get('School name', ''),
+            'background_line': f"- Background: {contact_bio}" if contact_bio else "",
+            'personalization': _BIO_GUIDANCE if contact_bio else _SCHOOL_GUIDANCE,
+            'random_number': random_number,
+            'retry_feedback': retry_feedback or ''
+        })
+
+        return [
+            {"type": "text", "text": fixed_part, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": variable_part}
+        ]
+
+    def personalize_email(self, email: Dict, contact: Dict) -> Dict:
+        """Fill the recipient placeholder of a shared school email for one contact."""
+        salutation = _salutation_name(contact)
+
+        def fill(text: str) -> str:
+            if salutation:
+                return text.replace(FIRST_NAME_PLACEHOLDER, salutation)
+            # No name to use: fall back to "Hi there" whatever greeting was written
+            text = _PLACEHOLDER_GREETING_RE.sub('Hi there', text)
+            return _STRAY_PLACEHOLDER_RE.sub('', text)
+
+        return {
+            **email,
+            'subject': fill(email.get('subject', '')),
+            'body': fill(email.get('body', '')),
+            'recipient_email': contact.get('email'),
+            'recipient_name': contact.get('name') or 'Administrator',
+            'contact_title': contact.get('title')
+        }
 
     def _parse_email_response(self, response: str) -> Dict:
         """Parse Claude's response into subject and body."""
-        lines = response.strip().split('\n')
-
-        subject = ''
-        body_lines = []
-        in_body = False
-
-        for line in lines:
-            if line.startswith('SUBJECT:'):
-                subject = line.replace('SUBJECT:', '').strip()
-            elif line.startswith('BODY:'):
-                in_body = True
-            elif in_body:
-                body_lines.append(line)
+        fields = dict(_EMAIL_RE.findall(response))
 
-        body = '\n'.join(body_lines).strip()
+        # The subject is the SUBJECT: line; anything after it belongs to the body section
+        subject = fields.get('SUBJECT', '').partition('\n')[0].strip()
+        body = fields.get('BODY', '').strip()
 
         # Fallback if parsing fails
         if not subject and not body:
-            # Try to find subject line and assume rest is body
-            if 'SUBJECT:' in response:
-                parts = response.split('SUBJECT:', 1)[1]
-                if '\n' in parts:
-                    subject_line, body_text = parts.split('\n', 1)
-                    subject = subject_line.strip()
-                    body = body_text.replace('BODY:', '').strip()
-                else:
-                    subject = parts.strip()
-            else:
-                # Use entire response as body with generic subject
-                subject = f"Partnership Opportunity with Theo"
-                body = response.strip()
+            # Use entire response as body with generic subject
+            subject = f"Partnership Opportunity with Theo"
+            body = response.strip()
 
         return {'subject': subject, 'body': body}
 
@@ -185,22 +351,10 @@ Just write the best email you can with the information provided."""
         Returns:
             Dict with issues found and suggestions
         """
-        school_info = "\n".join([f"- {k}: {v}" for k, v in school_data.items()])
+        # Rubric and output format are the same for every critique, so they form the cached prefix
+        rubric = f"""Review this cold outreach email for quality issues. Check for:
 
-        critique_prompt = f"""Review this cold outreach email for quality issues. Check for:
-
-1. Tone issues (disrespectful, too blunt, overly casual)
-2. Factual accuracy (do details match school data?)
-3. Professionalism (appropriate for student founder to administrator)
-4. Clarity and conciseness
-
-SCHOOL DATA:
-{school_info}
-
-EMAIL SUBJECT: {email['subject']}
-
-EMAIL BODY:
-{email['body']}
+{_CRITIQUE_CHECKS}
 
 Provide feedback in this format:
 ISSUES: [List any problems, or "None" if acceptable]
@@ -209,10 +363,16 @@ ACCURACY_SCORE: [1-10, where 10 is perfect]
 OVERALL_SCORE: [1-10, where 10 is perfect]
 SUGGESTIONS: [How to improve, or "None" if acceptable]"""
 
+        critique_prompt = [
+            {"type": "text", "text": rubric, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": self._critique_email_part(email, school_data)}
+        ]
+
         try:
-            response = self.client.messages.create(
+            response = create_message(
+                self.client, self.rate_limiter,
                 model=config.MODEL,
-                max_tokens=1000,
+                max_tokens=400,
                 temperature=0.3,
                 messages=[{"role": "user", "content": critique_prompt}]
             )
@@ -220,19 +380,20 @@ SUGGESTIONS: [How to improve, or "None" if acceptable]"""
             critique = response.content[0].text
 
             # Parse scores
+            fields = self._parse_critique_fields(critique)
             scores = {
-                'tone_score': self._extract_score(critique, 'TONE_SCORE'),
-                'accuracy_score': self._extract_score(critique, 'ACCURACY_SCORE'),
-                'overall_score': self._extract_score(critique, 'OVERALL_SCORE'),
-                'issues': self._extract_field(critique, 'ISSUES'),
-                'suggestions': self._extract_field(critique, 'SUGGESTIONS'),
+                'tone_score': self._extract_score(fields, 'TONE_SCORE'),
+                'accuracy_score': self._extract_score(fields, 'ACCURACY_SCORE'),
+                'overall_score': self._extract_score(fields, 'OVERALL_SCORE'),
+                'issues': fields.get('ISSUES', ''),
+                'suggestions': fields.get('SUGGESTIONS', ''),
                 'raw_critique': critique
             }
 
             return scores
 
         except Exception as e:
-            print(f"Error critiquing email: {str(e)}")
+            logger.error("Error critiquing email: %s", e)
             return {
                 'tone_score': 5,
                 'accuracy_score': 5,
@@ -242,23 +403,117 @@ SUGGESTIONS: [How to improve, or "None" if acceptable]"""
                 'error': str(e)
             }
 
-    def _extract_score(self, text: str, field_name: str) -> int:
-        """Extract a numerical score from critique text."""
-        import re
-        pattern = f"{field_name}:\\s*(\\d+)"
-        match = re.search(pattern, text)
+    def critique_emails_batch(
+        self,
+        emails: List[Dict],
+        school_datas: List[Dict],
+        fallback: bool = True
+    ) -> List[Optional[Dict]]:
+        """
+        Critique several emails in one Claude call, sharing the rubric between them.
+
+        Args:
+            emails: Generated email dicts
+            school_datas: School data for each email, in the same order
+            fallback: Critique emails missing from the batch reply individually;
+                if False they come back as None for the caller to handle
+
+        Returns:
+            One critique dict per email, in order (same shape as critique_email).
+        """
+        if len(emails) == 1 and fallback:
+            return [self.critique_email(emails[0], school_datas[0])]
+
+        rubric = f"""Review each of the cold outreach emails below for quality issues. Check for:
+
+{_CRITIQUE_CHECKS}
+
+Respond with ONLY a JSON array, one object per email, in this format:
+[{{"idx": 1, "issues": "List any problems, or None if acceptable", "tone_score": 1-10, "accuracy_score": 1-10, "overall_score": 1-10, "suggestions": "How to improve, or None if acceptable"}}]"""
+
+        email_parts = "\n\n".join(
+            f"=== EMAIL {idx} ===\n{self._critique_email_part(email, school_data)}"
+            for idx, (email, school_data) in enumerate(zip(emails, school_datas), 1)
+        )
+
+        critique_prompt = [
+            {"type": "text", "text": rubric, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": email_parts}
+        ]
+
+        critiques: Dict[int, Dict] = {}
+        try:
+            response = create_message(
+                self.client, self.rate_limiter,
+                model=config.MODEL,
+                max_tokens=300 * len(emails),
+                temperature=0.3,
+                messages=[{"role": "user", "content": critique_prompt}]
+            )
+
+            text = response.content[0].text
+            items = json.loads(text[text.index('['):text.rindex(']') + 1])
+
+            for item in items:
+                idx = int(item['idx'])
+                if 1 <= idx <= len(emails):
+                    critiques[idx] = {
+                        'tone_score': self._coerce_score(item.get('tone_score')),
+                        'accuracy_score': self._coerce_score(item.get('accuracy_score')),
+                        'overall_score': self._coerce_score(item.get('overall_score')),
+                        'issues': str(item.get('issues') or ''),
+                        'suggestions': str(item.get('suggestions') or ''),
+                        'raw_critique': json.dumps(item)
+                    }
+
+        except Exception as e:
+            logger.warning("Batch critique failed, critiquing emails individually: %s", e)
+
+        if not fallback:
+            return [critiques.get(idx) for idx in range(1, len(emails) + 1)]
+
+        return [
+            critiques.get(idx) or self.critique_email(email, school_data)
+            for idx, (email, school_data) in enumerate(zip(emails, school_datas), 1)
+        ]
+
+    def _critique_email_part(self, email: Dict, school_data: Dict) -> str:
+        """The per-email section of a critique prompt: school data plus the email itself."""
+        # Only the facts an email is likely to cite; the critic doesn't need the rest of the row
+        school_info = "\n".join(
+            f"- {key}: {school_data[key]}" for key in CRITIQUE_SCHOOL_FIELDS if school_data.get(key)
+        )
+        body = email['body']
+        words = body.split()
+        if len(words) > CRITIQUE_MAX_BODY_WORDS:
+            body = " ".join(words[:CRITIQUE_MAX_BODY_WORDS])
+
+        return f"""SCHOOL DATA:
+{school_info}
+
+EMAIL SUBJECT: {email['subject']}
+
+EMAIL BODY:
+{body}"""
+
+    def _coerce_score(self, value) -> int:
+        """A 1-10 score from a batch critique reply, defaulting to the middle score."""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 5
+
+    def _parse_critique_fields(self, text: str) -> Dict[str, str]:
+        """Split critique text into its labelled fields, joining wrapped lines."""
+        fields = {}
+        for label, value in _CRITIQUE_RE.findall(text):
+            # Keep the first occurrence of a label, as Claude sometimes repeats the format at the end
+            fields.setdefault(label, ' '.join(value.split()))
+        return fields
+
+    def _extract_score(self, fields: Dict[str, str], field_name: str) -> int:
+        """Extract a numerical score from parsed critique fields."""
+        match = _LEADING_INT_RE.match(fields.get(field_name, ''))
         if match:
-            return int(match.group(1))
+            return int(match.group())
         return 5  # Default middle score
-
-    def _extract_field(self, text: str, field_name: str) -> str:
-        """Extract a field value from critique text."""
-        lines = text.split('\n')
-        for i, line in enumerate(lines):
-            if line.startswith(f"{field_name}:"):
-                value = line.replace(f"{field_name}:", '').strip()
-                # If value continues on next lines, grab them too
-                if i + 1 < len(lines) and not any(lines[i + 1].startswith(f) for f in ['ISSUES:', 'TONE_SCORE:', 'ACCURACY_SCORE:', 'OVERALL_SCORE:', 'SUGGESTIONS:']):
-                    value += ' ' + lines[i + 1].strip()
-                return value
-        return ''
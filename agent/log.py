@@ -0,0 +1,42 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+_listener = None
+
+
+def setup_logging(level: str = 'INFO'):
+    """
+    Send log records from every thread through a queue to one console writer.
+
+    Worker threads format their records as they enqueue them (QueueHandler.prepare), but
+    never wait on each other for stdout; a single listener thread writes them out.
+    An unknown level name falls back to INFO. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    requested = level
+    level = str(level).upper()
+    valid = isinstance(logging.getLevelName(level), int)
+    if not valid:
+        level = 'INFO'
+
+    records = queue.SimpleQueue()
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter('%(message)s'))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(records))
+
+    _listener = logging.handlers.QueueListener(records, console)
+    _listener.start()
+    # Flush anything still queued when the app exits
+    atexit.register(_listener.stop)
+
+    if not valid:
+        logging.getLogger(__name__).warning("Unknown log level %r, using INFO", requested)
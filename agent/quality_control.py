@@ -1,6 +1,17 @@
+import re
 from typing import Dict, List
 import config
 
+# Signs that Claude wrote about the request instead of writing the email (case-sensitive)
+REFUSAL_PHRASES = ('I cannot write', 'I need to flag', 'PROBLEM:', 'CRITICAL ISSUE', 'What I need')
+
+# Words showing an email engages with the school's tuition
+TUITION_KEYWORDS = ('tuition', 'cost', 'budget', 'affordability')
+
+# The body should open with a greeting and close with a sign-off near the end
+GREETINGS = ('dear', 'hello', 'hi')
+CLOSINGS = ('sincerely', 'best regards', 'best', 'thank you', 'thanks')
+
 
 class QualityControl:
     """Validates email quality and calculates confidence scores."""
@@ -20,7 +31,73 @@ class QualityControl:
             'we noticed', 'we developed', 'we created'
         ]
 
-    def validate_email(self, email: Dict, school_data: Dict, critique: Dict = None) -> Dict:
+        # Overly casual language
+        self.casual_words = ['hey', 'ya', 'gonna', 'wanna', 'cool', 'awesome sauce']
+
+        self.refusal_phrases = list(REFUSAL_PHRASES)
+
+        # One pattern for every phrase list, so a body is scanned once instead of once per phrase.
+        # The lookahead reports matches at every position, like `phrase in body` would.
+        self.phrase_tags: Dict[str, List[str]] = {}
+        self.phrase_order: Dict[str, Dict[str, int]] = {}
+        tagged = [
+            ('red', self.tone_red_flags),
+            ('positive', self.positive_tone_indicators),
+            ('casual', self.casual_words),
+            ('refusal', self.refusal_phrases)
+        ]
+        for tag, phrases in tagged:
+            self.phrase_order[tag] = {}
+            for index, phrase in enumerate(phrases):
+                self.phrase_tags.setdefault(phrase.lower(), []).append(tag)
+                self.phrase_order[tag].setdefault(phrase.lower(), index)
+
+        # Longest first, so a phrase that extends another at the same position wins
+        tone_phrases = sorted(self.tone_red_flags + self.positive_tone_indicators + self.casual_words, key=len, reverse=True)
+        refusal_phrases = sorted(self.refusal_phrases, key=len, reverse=True)
+        self.phrase_pattern = re.compile(
+            '(?=((?i:' + '|'.join(map(re.escape, tone_phrases)) + ')|'
+            + '|'.join(map(re.escape, refusal_phrases)) + '))'
+        )
+
+    def scan_phrases(self, body: str) -> Dict[str, List[str]]:
+        """
+        Find every tracked phrase in an email body in a single pass.
+
+        Args:
+            body: Email body
+
+        Returns:
+            Dict of tag ('red', 'positive', 'casual', 'refusal') to the distinct phrases found,
+            in the order of the tag's phrase list
+        """
+        hits = {'red': [], 'positive': [], 'casual': [], 'refusal': []}
+        for match in self.phrase_pattern.finditer(body):
+            phrase = match.group(1).lower()
+            for tag in self.phrase_tags.get(phrase, ()):
+                if phrase not in hits[tag]:
+                    hits[tag].append(phrase)
+        for tag, phrases in hits.items():
+            phrases.sort(key=self.phrase_order[tag].get)
+        return hits
+
+    @staticmethod
+    def precompute_school_ctx(school_data: Dict) -> Dict:
+        """
+        School facts the accuracy check needs, derived once per school instead of per email.
+
+        Args:
+            school_data: Original school data
+
+        Returns:
+            Dict with school_name_lower and has_tuition
+        """
+        return {
+            'school_name_lower': school_data.get('School name', '').lower(),
+            'has_tuition': bool(str(school_data.get('Tuition', '')))
+        }
+
+    def validate_email(self, email: Dict, school_data: Dict, critique: Dict = None, school_ctx: Dict = None) -> Dict:
         """
         Validate email quality and calculate confidence score.
 
@@ -28,48 +105,18 @@ class QualityControl:
             email: Generated email dict
             school_data: Original school data
             critique: Optional self-critique from email writer
+            school_ctx: Optional precompute_school_ctx(school_data), reused across a school's emails
 
         Returns:
             Dict with quality_score, flags, issues, and recommendations
         """
-        issues = []
-        flags = []
-        scores = {
-            'tone': 100,
-            'accuracy': 100,
-            'structure': 100,
-            'length': 100
-        }
-
         subject = email.get('subject', '')
         body = email.get('body', '')
 
-        # 1. Tone check
-        tone_result = self._check_tone(body)
-        scores['tone'] = tone_result['score']
-        if tone_result['issues']:
-            issues.extend(tone_result['issues'])
-            flags.append('tone')
-
-        # 2. Accuracy check
-        accuracy_result = self._check_accuracy(body, school_data)
-        scores['accuracy'] = accuracy_result['score']
-        if accuracy_result['issues']:
-            issues.extend(accuracy_result['issues'])
-            flags.append('accuracy')
-
-        # 3. Structure check
-        structure_result = self._check_structure(subject, body)
-        scores['structure'] = structure_result['score']
-        if structure_result['issues']:
-            issues.extend(structure_result['issues'])
-            flags.append('structure')
-
-        # 4. Length check
-        length_result = self._check_length(body)
-        scores['length'] = length_result['score']
-        if length_result['issues']:
-            issues.extend(length_result['issues'])
+        checks = self._run_checks(subject, body, school_ctx or self.precompute_school_ctx(school_data))
+        scores = checks['scores']
+        issues = checks['issues']
+        flags = checks['flags']
 
         # 5. Incorporate self-critique if available
         if critique:
@@ -104,119 +151,104 @@ class QualityControl:
             'quality_score': int(quality_score),
             'component_scores': scores,
             'issues': issues,
-            'flags': list(set(flags)),
+            'flags': list(dict.fromkeys(flags)),
             'needs_retry': quality_score < config.MIN_CONFIDENCE_SCORE,
             'needs_human_review': quality_score < config.MIN_CONFIDENCE_SCORE or len(flags) > 1
         }
 
-    def _check_tone(self, body: str) -> Dict:
-        """Check for appropriate, respectful tone."""
-        body_lower = body.lower()
-        issues = []
-        score = 100
-
-        # Check for red flags
-        found_red_flags = [flag for flag in self.tone_red_flags if flag in body_lower]
-        if found_red_flags:
-            issues.append(f"Potentially disrespectful/blunt phrases: {', '.join(found_red_flags)}")
-            score -= len(found_red_flags) * 15
-
-        # Check for positive indicators
-        found_positive = sum(1 for indicator in self.positive_tone_indicators if indicator in body_lower)
-        if found_positive == 0:
-            issues.append("Missing student founder voice (humble, earnest tone)")
-            score -= 20
-
-        # Check for overly casual language
-        casual_words = ['hey', 'ya', 'gonna', 'wanna', 'cool', 'awesome sauce']
-        found_casual = [word for word in casual_words if word in body_lower]
-        if found_casual:
-            issues.append(f"Overly casual language: {', '.join(found_casual)}")
-            score -= 20
+    def _run_checks(self, subject: str, body: str, school_ctx: Dict) -> Dict:
+        """
+        Run the tone, accuracy, structure and length checks in one pass over the email.
 
-        return {
-            'score': max(score, 0),
-            'issues': issues
-        }
+        The body is lowercased, phrase-scanned and split once, and every check reads
+        from those instead of rescanning the text.
 
-    def _check_accuracy(self, body: str, school_data: Dict) -> Dict:
-        """Verify factual accuracy against school data."""
-        issues = []
-        score = 100
+        Args:
+            subject: Email subject
+            body: Email body
+            school_ctx: precompute_school_ctx(school_data)
 
-        # Check if school name is mentioned correctly
-        school_name = school_data.get('School name', '')
-        if school_name and school_name.lower() not in body.lower():
-            issues.append("School name not mentioned in email")
-            score -= 15
+        Returns:
+            Dict with component scores, issues, and flags (in check order)
+        """
+        body_lower = body.lower()
+        hits = self.scan_phrases(body)
+        word_count = len(body.split())
+        issues = []
+        flags = []
 
-        # Check if key details are referenced (tuition, pain points, etc.)
-        tuition = str(school_data.get('Tuition', ''))
-        pain_signal = str(school_data.get('Pain signal', ''))
+        # 1. Tone: respectful, humble student founder voice
+        tone = 100
+        tone_issues = []
+        if hits['red']:
+            tone_issues.append(f"Potentially disrespectful/blunt phrases: {', '.join(hits['red'])}")
+            tone -= len(hits['red']) * 15
+        if not hits['positive']:
+            tone_issues.append("Missing student founder voice (humble, earnest tone)")
+            tone -= 20
+        if hits['casual']:
+            tone_issues.append(f"Overly casual language: {', '.join(hits['casual'])}")
+            tone -= 20
+        if tone_issues:
+            issues.extend(tone_issues)
+            flags.append('tone')
 
-        # Allow some flexibility - don't require exact match, but check for relevance
+        # 2. Accuracy: facts that should match the school data.
         # This is basic; the Claude self-critique will catch hallucinations better
+        accuracy = 100
+        school_name_lower = school_ctx['school_name_lower']
+        if school_name_lower and school_name_lower not in body_lower:
+            issues.append("School name not mentioned in email")
+            flags.append('accuracy')
+            accuracy -= 15
+        if school_ctx['has_tuition'] and not any(keyword in body_lower for keyword in TUITION_KEYWORDS):
+            accuracy -= 10  # Minor deduction if relevant context missing
 
-        if not any(keyword in body.lower() for keyword in ['tuition', 'cost', 'budget', 'affordability']) and tuition:
-            score -= 10  # Minor deduction if relevant context missing
-
-        return {
-            'score': max(score, 0),
-            'issues': issues
-        }
-
-    def _check_structure(self, subject: str, body: str) -> Dict:
-        """Check email structure and formatting."""
-        issues = []
-        score = 100
-
-        # Check subject line
+        # 3. Structure: subject, greeting, closing
+        structure = 100
+        structure_issues = []
         if not subject or len(subject.strip()) == 0:
-            issues.append("Missing subject line")
-            score -= 30
+            structure_issues.append("Missing subject line")
+            structure -= 30
         elif len(subject) > 80:
-            issues.append("Subject line too long (>80 chars)")
-            score -= 10
+            structure_issues.append("Subject line too long (>80 chars)")
+            structure -= 10
 
-        # Check body structure
-        if not body or len(body.strip()) == 0:
-            issues.append("Empty email body")
-            score -= 50
+        if not body_lower or len(body_lower.strip()) == 0:
+            structure_issues.append("Empty email body")
+            structure -= 50
         else:
-            # Check for greeting
-            greetings = ['dear', 'hello', 'hi']
-            if not any(greeting in body[:100].lower() for greeting in greetings):
-                issues.append("Missing proper greeting")
-                score -= 10
-
-            # Check for signature/closing
-            closings = ['sincerely', 'best regards', 'best', 'thank you', 'thanks']
-            if not any(closing in body[-200:].lower() for closing in closings):
-                issues.append("Missing proper closing")
-                score -= 10
-
-        return {
-            'score': max(score, 0),
-            'issues': issues
-        }
-
-    def _check_length(self, body: str) -> Dict:
-        """Check if email is appropriate length."""
-        issues = []
-        score = 100
-
-        word_count = len(body.split())
+            if not body_lower.lstrip().startswith(GREETINGS):
+                structure_issues.append("Missing proper greeting")
+                structure -= 10
+
+            # A closing is followed by the signature, so look through the tail rather than at the very end
+            body_tail = body_lower[-200:]
+            if not any(closing in body_tail for closing in CLOSINGS):
+                structure_issues.append("Missing proper closing")
+                structure -= 10
+        if structure_issues:
+            issues.extend(structure_issues)
+            flags.append('structure')
 
+        # 4. Length: not flagged, only scored
+        length = 100
         if word_count < 50:
             issues.append(f"Email too short ({word_count} words, recommend 100-300)")
-            score -= 20
+            length -= 20
         elif word_count > 400:
             issues.append(f"Email too long ({word_count} words, recommend 100-300)")
-            score -= 15
+            length -= 15
 
         return {
-            'score': max(score, 0),
-            'issues': issues
+            'scores': {
+                'tone': max(tone, 0),
+                'accuracy': max(accuracy, 0),
+                'structure': max(structure, 0),
+                'length': max(length, 0)
+            },
+            'issues': issues,
+            'flags': flags
         }
 
     def generate_retry_feedback(self, validation_result: Dict, critique: Dict = None) -> str:
@@ -0,0 +1,224 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+import anthropic
+import config
+
+logger = logging.getLogger(__name__)
+
+# Retries for 429s and transient failures; the client's own retries are off so they don't stack
+MAX_RATE_LIMIT_RETRIES = 3
+
+# Status codes the SDK would retry on its own: request timeout, lock conflict, overloaded
+RETRYABLE_STATUS_CODES = (408, 409, 529)
+
+
+class TokenBucket:
+    """Token bucket shared by worker threads to pace calls to an API provider."""
+
+    def __init__(self, rate_per_second: float):
+        self.rate = rate_per_second
+        self.capacity = max(rate_per_second, 1.0)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+
+            if self.tokens < 1:
+                # Sleep under the lock so waiting threads are released one at a time
+                time.sleep((1 - self.tokens) / self.rate)
+                self.last = time.monotonic()
+                self.tokens = 0
+            else:
+                self.tokens -= 1
+
+
+class RateLimiter:
+    """
+    Proactive limiter for Anthropic calls: a per-second token bucket plus
+    sliding one-minute budgets for requests and tokens.
+
+    Callers wait here instead of spending a request on a guaranteed 429.
+    Token spend is reserved from an estimate and corrected from the
+    response's reported usage via settle().
+    """
+
+    WINDOW_SECONDS = 60
+
+    def __init__(self, requests_per_second: float, requests_per_minute: int, tokens_per_minute: int):
+        self.bucket = TokenBucket(requests_per_second)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.lock = threading.Lock()
+        # Each entry is [timestamp, tokens]; a list so settle() can correct it in place
+        self.window: deque = deque()
+        self.tokens_in_window = 0
+
+    def _prune(self, now: float):
+        while self.window and now - self.window[0][0] >= self.WINDOW_SECONDS:
+            self.tokens_in_window -= self.window.popleft()[1]
+
+    def acquire(self, estimated_tokens: int = 0) -> List:
+        """Block until the request fits both per-minute budgets; returns a ticket for settle()."""
+        self.bucket.acquire()
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._prune(now)
+
+                # An empty window always admits, so one oversized request cannot block forever
+                fits = (
+                    len(self.window) < self.requests_per_minute
+                    and self.tokens_in_window + estimated_tokens <= self.tokens_per_minute
+                )
+                if fits or not self.window:
+                    ticket = [now, estimated_tokens]
+                    self.window.append(ticket)
+                    self.tokens_in_window += estimated_tokens
+                    return ticket
+
+                wait = self.WINDOW_SECONDS - (now - self.window[0][0])
+
+            time.sleep(max(wait, 0.05))
+
+    def settle(self, ticket: List, actual_tokens: int):
+        """Replace a request's estimated token spend with what the API reported."""
+        with self.lock:
+            # Skip tickets that have already aged out of the window
+            if self.window and ticket[0] >= self.window[0][0]:
+                self.tokens_in_window += actual_tokens - ticket[1]
+            ticket[1] = actual_tokens
+
+
+# Process-wide limiter so concurrent generation runs share one request budget
+ANTHROPIC_LIMITER = RateLimiter(config.ANTHROPIC_RPS, config.RPM_LIMIT, config.TPM_LIMIT)
+
+
+def _estimate_tokens(kwargs: Dict) -> int:
+    """Rough token cost of a request: prompt characters / 4 plus the output allowance."""
+    prompt_chars = 0
+    for message in kwargs.get('messages', []):
+        content = message.get('content', '')
+        if isinstance(content, str):
+            prompt_chars += len(content)
+        else:
+            prompt_chars += sum(len(block.get('text', '')) for block in content)
+    return prompt_chars // 4 + kwargs.get('max_tokens', 0)
+
+
+def _reported_tokens(response) -> Optional[int]:
+    """Input plus output tokens from a response's usage, if reported."""
+    usage = getattr(response, 'usage', None)
+    try:
+        return usage.input_tokens + usage.output_tokens
+    except (AttributeError, TypeError):
+        return None
+
+
+def retry_after_seconds(error: anthropic.APIError) -> Optional[float]:
+    """Read the Retry-After header from an error response, if present and numeric."""
+    try:
+        return float(error.response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error: anthropic.APIError) -> bool:
+    """True for 429s, dropped connections, 5xx and the other statuses the SDK retries."""
+    if isinstance(error, (anthropic.RateLimitError, anthropic.APIConnectionError, anthropic.InternalServerError)):
+        return True
+    return isinstance(error, anthropic.APIStatusError) and error.status_code in RETRYABLE_STATUS_CODES
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Jittered exponential backoff before retry number attempt (1-based).
+
+    Jitter keeps parallel workers that were throttled together from retrying in lockstep;
+    the delay is never shorter than the server's Retry-After.
+    """
+    delay = min(config.RETRY_MAX_DELAY, config.RETRY_DELAY * 2 ** (attempt - 1))
+    delay += random.uniform(0, config.RETRY_JITTER)
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def _call_with_backoff(limiter: Optional[RateLimiter], call, estimated_tokens: int):
+    """Run call() once the limiter admits it, retrying 429s and transient errors with backoff_delay."""
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        ticket = limiter.acquire(estimated_tokens) if limiter else None
+        try:
+            response = call()
+        except anthropic.APIError as e:
+            if attempt == MAX_RATE_LIMIT_RETRIES or not _is_retryable(e):
+                raise
+            delay = backoff_delay(attempt + 1, retry_after_seconds(e))
+            if isinstance(e, anthropic.RateLimitError):
+                logger.warning("  Rate limited by Anthropic, retrying in %.1fs...", delay)
+            else:
+                logger.warning("  Anthropic request failed (%s), retrying in %.1fs...", type(e).__name__, delay)
+            time.sleep(delay)
+            continue
+
+        actual_tokens = _reported_tokens(response)
+        if ticket is not None and actual_tokens is not None:
+            limiter.settle(ticket, actual_tokens)
+        return response
+
+
+def create_message(client: anthropic.Anthropic, limiter: Optional[RateLimiter] = None, **kwargs):
+    """
+    Call client.messages.create once the limiter admits it, backing off on 429s,
+    dropped connections, 5xx and overloaded responses.
+
+    Waits with backoff_delay, honoring Retry-After when the API sends it.
+    """
+    return _call_with_backoff(limiter, lambda: client.messages.create(**kwargs), _estimate_tokens(kwargs))
+
+
+def stream_message(
+    client: anthropic.Anthropic,
+    limiter: Optional[RateLimiter] = None,
+    abort_check: Optional[Callable[[str], bool]] = None,
+    abort_check_chars: int = 200,
+    **kwargs
+):
+    """
+    Like create_message, but receives the response over a stream and returns the final message.
+
+    Used for long-running calls (web search) so the connection carries data the whole
+    time instead of idling until the full reply is ready.
+
+    If abort_check is given, it is called once with the first abort_check_chars characters
+    of text; when it returns True the stream is closed and the partial message is returned,
+    so the rest of the reply is never generated (or billed).
+    """
+    def call():
+        with client.messages.stream(**kwargs) as stream:
+            text_stream = stream.text_stream
+
+            if abort_check is not None:
+                head = ''
+                for chunk in text_stream:
+                    head += chunk
+                    if len(head) >= abort_check_chars:
+                        break
+                if abort_check(head[:abort_check_chars]):
+                    return stream.current_message_snapshot
+
+            for _ in text_stream:
+                pass
+            return stream.get_final_message()
+
+    return _call_with_backoff(limiter, call, _estimate_tokens(kwargs))
@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+# Words too generic to tell whether a contact's email domain belongs to the school
+DOMAIN_STOP_WORDS = frozenset(['school', 'academy', 'prep', 'the', 'of'])
+
+
+@dataclass(frozen=True, slots=True)
+class SchoolKey:
+    """Normalized forms of a school name, derived once and reused for every contact."""
+
+    raw: str
+    keywords: Tuple[str, ...]
+    # Keywords specific enough to check an export's recipient domain against
+    domain_keywords: Tuple[str, ...]
+    domain_guess: str
+
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def from_raw(cls, raw: str) -> 'SchoolKey':
+        """Build (or fetch the cached) key for a school name."""
+        lower = raw.casefold()
+        slug = lower.replace(' ', '').replace('-', '')
+        return cls(
+            raw=raw,
+            # Short words ("the", "of", "st.") are too common to match a domain on
+            keywords=tuple(k for k in lower.split() if len(k) > 3),
+            domain_keywords=tuple(
+                k for k in lower.replace("'", "").split() if len(k) > 3 and k not in DOMAIN_STOP_WORDS
+            ),
+            domain_guess=f"{slug[:20]}.edu"
+        )
@@ -0,0 +1,33 @@
+import os
+import shelve
+import threading
+import time
+from typing import Any, Optional
+
+# shelve is not safe for concurrent access from worker threads. One lock covers every cache
+# file, since the first dbm.open in a process also imports its backend, which is not thread-safe.
+_shelf_lock = threading.Lock()
+
+
+class ShelfCache:
+    """Persistent key-value cache in a shelve file, with entries that expire after a TTL."""
+
+    def __init__(self, cache_dir: str, name: str, ttl_seconds: int):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, name)
+        self.ttl_seconds = ttl_seconds
+
+    def get_entry(self, key: str) -> Optional[Any]:
+        """Return the value stored under key, or None on a miss or expired entry."""
+        with _shelf_lock, shelve.open(self.path) as db:
+            entry = db.get(key)
+
+        # Entries written in an older format have no 'value' and count as misses
+        if not entry or 'value' not in entry or time.time() - entry['saved_at'] > self.ttl_seconds:
+            return None
+        return entry['value']
+
+    def set_entry(self, key: str, value: Any):
+        """Store value under key, timestamped for expiry."""
+        with _shelf_lock, shelve.open(self.path) as db:
+            db[key] = {'saved_at': time.time(), 'value': value}
@@ -1,44 +1,477 @@
-from flask import Flask, render_template, request, jsonify, send_file, make_response, Response
+from flask import Flask, render_template, request, jsonify, make_response, Response
+import numpy as np
 import pandas as pd
+import atexit
+import csv
 import os
 import json
-from datetime import datetime
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import uuid
 import queue
+import sqlite3
 import threading
 import config
 from agent.email_generator import EmailGenerator
+from agent.log import setup_logging
+
+# orjson encodes and decodes large session files several times faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# zstd at level 1 shrinks session files several times over at close to memcpy speed
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+# pyarrow's multithreaded C++ parser is much faster on large CSVs; pandas is the fallback
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:
+    pa = None
 
 app = Flask(__name__)
+setup_logging(config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
 
 # Ensure directories exist
 os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(config.OUTPUT_FOLDER, exist_ok=True)
-os.makedirs('data/sessions', exist_ok=True)
+os.makedirs(os.path.dirname(config.SESSION_DB), exist_ok=True)
+
+
+# Columns an uploaded CSV must have; every step of the pipeline is keyed by school name
+REQUIRED_COLUMNS = ('School name',)
+# Name, email, title and bio columns of each pre-researched contact slot (up to 5 contacts)
+CONTACT_SLOTS = tuple(
+    (f'Contact {i} Name', f'Contact {i} Email', f'Contact {i} Title', f'Contact {i} Bio')
+    for i in range(1, 6)
+)
+
+
+def read_csv_header(csv_path):
+    """Column names of a CSV, reading only its first block rather than the whole file."""
+    if pa is None:
+        return list(pd.read_csv(csv_path, nrows=0).columns)
+    with pacsv.open_csv(csv_path) as reader:
+        return reader.schema.names
+
+
+def read_csv_columns(csv_path):
+    """
+    Parse an uploaded CSV into {column name: list of values}, with empty cells as None.
+
+    Every value is kept as the text in the file, so cells like dates reach the prompts unchanged.
+    Uses pyarrow when it is installed, pandas otherwise.
+    """
+    if pa is None:
+        df = pd.read_csv(csv_path, dtype=str)
+        return df.astype(object).where(df.notna(), None).to_dict('list')
+
+    # pyarrow has no switch for type inference, so every column is named as a string column
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        header = next(csv.reader(f), [])
+    table = pacsv.read_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(use_threads=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in header},
+            strings_can_be_null=True
+        )
+    )
+    return table.to_pydict()
 
 
-def get_session_id():
-    """Get or create session ID from cookie."""
+def cookie_session_id():
+    """
+    Session ID from the cookie, if it is a well-formed UUID.
+
+    Session IDs name files on disk, so anything else (e.g. a path) is ignored.
+
+    Returns:
+        The session ID, or None if the cookie is missing or malformed
+    """
     session_id = request.cookies.get('session_id')
     if not session_id:
-        session_id = str(uuid.uuid4())
-    return session_id
+        return None
+    try:
+        return str(uuid.UUID(session_id))
+    except ValueError:
+        return None
+
+
+def get_session_id():
+    """Get or create session ID from cookie."""
+    return cookie_session_id() or str(uuid.uuid4())
+
+
+def load_schools(csv_path):
+    """
+    Parse an uploaded schools CSV, attaching any "Contact N" columns as pre-researched contacts.
+
+    Returns:
+        (list of school dicts, list of column names)
+    """
+    csv_columns = read_csv_columns(csv_path)
+    columns = list(csv_columns)
+    rows = [dict(zip(columns, values)) for values in zip(*csv_columns.values())]
+
+    # Parse schools with embedded contacts
+    schools = rows
+    # Checked once, so the per-row debug lines cost nothing when disabled
+    debug = logger.isEnabledFor(logging.DEBUG)
+    row_count = len(rows)
+    contacts_by_row = [[] for _ in range(row_count)]
+
+    # Extract contacts if provided (Contact 1 Name, Contact 1 Email, etc.), one column group
+    # at a time: the NA mask is computed over whole columns instead of cell by cell
+    missing = [None] * row_count
+    present_slots = [slot for slot in CONTACT_SLOTS if slot[0] in csv_columns]
+    for name_col, email_col, title_col, bio_col in present_slots:
+        names = csv_columns[name_col]
+        emails = csv_columns.get(email_col, missing)
+        titles = csv_columns.get(title_col, missing)
+        bios = csv_columns.get(bio_col, missing)
+
+        names = np.asarray(names, dtype=object)
+        has_name = pd.notna(names) & (names != '')
+
+        for row_idx in np.flatnonzero(has_name):
+            contact_email = str(emails[row_idx]).strip() if pd.notna(emails[row_idx]) else ''
+            contact_name = str(names[row_idx]).strip()
+
+            contacts_by_row[row_idx].append({
+                'name': contact_name,
+                'email': contact_email,
+                'title': str(titles[row_idx]).strip() if pd.notna(titles[row_idx]) else '',
+                'bio': str(bios[row_idx]).strip() if pd.notna(bios[row_idx]) else '',
+                'confidence': 100,  # Pre-researched contacts are high confidence
+                'source': 'CSV (pre-researched)',
+                'flagged': False
+            })
+
+            if debug:
+                logger.debug("  Row %d: %s -> %s (%s)", row_idx, rows[row_idx].get('School name'), contact_name, contact_email)
+
+    # Add pre-researched contacts to school data
+    for school_dict, contacts in zip(schools, contacts_by_row):
+        if contacts:
+            school_dict['_preresearched_contacts'] = contacts
+
+        if debug:
+            if contacts:
+                logger.debug("✓ School '%s' has %d contacts", school_dict.get('School name'), len(contacts))
+            else:
+                logger.debug("⚠ School '%s' has NO pre-researched contacts (will use web search)", school_dict.get('School name'))
+
+    return schools, columns
+
+
+def csv_fingerprint(csv_path):
+    """Size and mtime of a file, to tell whether the uploaded CSV changed since it was parsed."""
+    stat = os.stat(csv_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def session_schools(session_data):
+    """
+    Schools for a session, re-read from its uploaded CSV.
+
+    Returns None if nothing was uploaded or the CSV is gone or was replaced since.
+    """
+    if 'schools' in session_data:
+        # Sessions saved before schools were re-read from the CSV
+        return session_data['schools']
+
+    csv_path = session_data.get('csv_path')
+    if not csv_path or not os.path.exists(csv_path):
+        return None
+    fingerprint = csv_fingerprint(csv_path)
+    if fingerprint != session_data.get('csv_fingerprint'):
+        return None
+
+    schools, _ = load_schools_cached(csv_path, *fingerprint)
+    # A fresh list per caller; the school dicts themselves are shared and read-only
+    return list(schools)
+
+
+@lru_cache(maxsize=8)
+def load_schools_cached(csv_path, size, mtime_ns):
+    """
+    load_schools, memoized per version of the file.
+
+    size and mtime_ns (from csv_fingerprint) only key the cache, so a replaced CSV is re-parsed
+    while repeat generations from the same upload skip parsing entirely.
+    """
+    return load_schools(csv_path)
+
+
+def export_stats(export_data):
+    """Email count, flagged count and average confidence of export rows, in one pass."""
+    total_emails = flagged_count = confidence_sum = 0
+    for row in export_data:
+        total_emails += 1
+        if row['Flags']:
+            flagged_count += 1
+        confidence_sum += row['Confidence Score']
+
+    avg_confidence = confidence_sum / total_emails if total_emails > 0 else 0
+    return {
+        'total_emails': total_emails,
+        'flagged_count': flagged_count,
+        'avg_confidence': int(avg_confidence)
+    }
+
+
+def set_export_data(session_data, export_data):
+    """Store export rows in a session with a new version tag, used as their ETag."""
+    session_data['export_data'] = export_data
+    session_data['export_version'] = uuid.uuid4().hex
+
+
+def not_modified(session_data):
+    """
+    A 304 response if the client already has this version of the session's export rows.
+
+    Returns:
+        Response, or None when the client's copy is missing or stale
+    """
+    version = session_data.get('export_version')
+    if version and request.if_none_match.contains(version):
+        response = make_response('', 304)
+        response.set_etag(version)
+        return response
+    return None
+
+
+def with_export_etag(response, session_data):
+    """Tag a response built from the session's export rows so browsers revalidate it."""
+    version = session_data.get('export_version')
+    if version:
+        response.set_etag(version)
+        # Reviews edit the rows in place, so caches must check back every time
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# Generator shared by every request; built on first use
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_generator():
+    """Return the process-wide EmailGenerator, creating it on first call."""
+    global _generator
+    with _generator_lock:
+        if _generator is None:
+            _generator = EmailGenerator(config.ANTHROPIC_API_KEY, config.BRAVE_API_KEY)
+        return _generator
+
+
+# Parsed sessions by session id, as [store version, data, unsaved fields], most recently
+# used last. A request reuses the parsed dict while the stored session is unchanged instead
+# of decoding it again. Unsaved fields is a set of keys, or None for all of them.
+_session_cache = OrderedDict()
+_session_lock = threading.Lock()
+# Delayed writes not yet flushed to the store, by session id
+_pending_flushes = {}
+
+# Session store: one row per session key, so a review edit rewrites export_data but not
+# results. WAL keeps readers going during writes, and synchronous=NORMAL skips the fsync on
+# every commit. Shared by all threads, so only used with _session_lock held.
+_session_db = sqlite3.connect(config.SESSION_DB, check_same_thread=False)
+_session_db.executescript("""
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS session_fields (
+        session_id TEXT NOT NULL,
+        field TEXT NOT NULL,
+        value BLOB NOT NULL,
+        PRIMARY KEY (session_id, field)
+    ) WITHOUT ROWID;
+""")
+
+# Values are stored zstd-compressed when zstandard is installed; both kinds are read
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+# Reused for every write; only called with _session_lock held, as it is not thread-safe
+_session_compressor = zstd.ZstdCompressor(level=1) if zstd is not None else None
+
+
+def dump_json(data):
+    """Encode data as JSON bytes (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data).encode()
+
+
+def load_json(raw):
+    """Decode JSON bytes (orjson when installed)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _encode_field(value):
+    raw = dump_json(value)
+    if _session_compressor is not None:
+        raw = _session_compressor.compress(raw)
+    return raw
+
+
+def _decode_field(raw):
+    # JSON text never starts with the zstd frame magic
+    if raw[:4] == ZSTD_MAGIC:
+        raw = zstd.ZstdDecompressor().decompress(raw)
+    return load_json(raw)
+
+
+def _cache_session(session_id, version, data, fields=None):
+    """Remember parsed session data and which fields are unsaved; caller holds _session_lock."""
+    entry = _session_cache.get(session_id)
+    if fields is not None:
+        fields = set(fields)
+        if entry:
+            # Still owe any fields from an earlier save that has not been written yet
+            fields = None if entry[2] is None else entry[2] | fields
+
+    _session_cache[session_id] = [version, data, fields]
+    _session_cache.move_to_end(session_id)
+    while len(_session_cache) > config.SESSION_CACHE_SIZE:
+        evicted_id, evicted_entry = _session_cache.popitem(last=False)
+        if evicted_id in _pending_flushes:
+            # Never drop unsaved edits; write them out before forgetting the session
+            _pending_flushes.pop(evicted_id).cancel()
+            _write_session(evicted_id, evicted_entry)
+
+
+def _write_session(session_id, entry):
+    """Write a session's unsaved fields in one transaction; caller holds _session_lock."""
+    data, fields = entry[1], entry[2]
+    with _session_db:
+        if fields is None:
+            fields = data
+            # Drop rows for keys the data no longer has
+            _session_db.execute('DELETE FROM session_fields WHERE session_id = ?', (session_id,))
+        _session_db.executemany(
+            'INSERT OR REPLACE INTO session_fields (session_id, field, value) VALUES (?, ?, ?)',
+            [(session_id, field, _encode_field(data[field])) for field in fields]
+        )
+        _session_db.execute(
+            'INSERT INTO sessions (session_id, version) VALUES (?, 1) '
+            'ON CONFLICT (session_id) DO UPDATE SET version = version + 1',
+            (session_id,)
+        )
+        entry[0] = _session_version(session_id)
+    entry[2] = set()
+
+
+def _session_version(session_id):
+    row = _session_db.execute('SELECT version FROM sessions WHERE session_id = ?', (session_id,)).fetchone()
+    return row[0] if row else None
+
+
+def _pop_legacy_session(session_id):
+    """
+    Read and delete a session saved as data/sessions/<id>.json, before sessions moved to SQLite.
+
+    Returns:
+        Session data dict, or None if there is no such session
+    """
+    sessions_dir = os.path.abspath(os.path.dirname(config.SESSION_DB))
+    legacy_file = os.path.abspath(os.path.join(sessions_dir, f'{session_id}.json'))
+    # Never follow a session ID outside the sessions directory
+    if os.path.basename(session_id) != session_id or os.path.dirname(legacy_file) != sessions_dir:
+        return None
+
+    if not os.path.isfile(legacy_file):
+        return None
+    with open(legacy_file, 'rb') as f:
+        data = load_json(f.read())
+    os.remove(legacy_file)
+    return data
+
+
+def _flush_session(session_id):
+    with _session_lock:
+        _pending_flushes.pop(session_id, None)
+        entry = _session_cache.get(session_id)
+        if entry:
+            _write_session(session_id, entry)
 
 
 def get_session_data(session_id):
-    """Load session data from file."""
-    session_file = f'data/sessions/{session_id}.json'
-    if os.path.exists(session_file):
-        with open(session_file, 'r') as f:
-            return json.load(f)
-    return {}
+    """Load session data, reusing the parsed copy while the stored session is unchanged."""
+    with _session_lock:
+        entry = _session_cache.get(session_id)
+        # Unflushed edits are newer than the store
+        if entry and session_id in _pending_flushes:
+            return entry[1]
+        version = _session_version(session_id)
+        if entry and version is not None and entry[0] == version:
+            _session_cache.move_to_end(session_id)
+            return entry[1]
+        if version is not None:
+            rows = _session_db.execute(
+                'SELECT field, value FROM session_fields WHERE session_id = ?', (session_id,)
+            ).fetchall()
+
+    if version is None:
+        data = _pop_legacy_session(session_id)
+        if data is None:
+            return {}
+        save_session_data(session_id, data)
+        return data
+
+    # Decode outside the lock; it is the slow part for large sessions
+    data = {field: _decode_field(value) for field, value in rows}
+
+    with _session_lock:
+        # A save may have landed while the rows were decoded; keep the newer data
+        if session_id in _pending_flushes:
+            return _session_cache[session_id][1]
+        _cache_session(session_id, version, data, fields=())
+    return data
+
+
+def save_session_data(session_id, data, delay=0, fields=None):
+    """
+    Save session data to the session store.
+
+    With a delay, the write is deferred and coalesced with any other saves for the
+    session in that window (used for rapid review edits); reads see the new data at once.
+    Pass fields to write only those keys, when the caller knows nothing else changed.
+    """
+    with _session_lock:
+        _cache_session(session_id, None, data, fields)
+        pending = _pending_flushes.pop(session_id, None)
+        if pending:
+            pending.cancel()
+
+        if delay:
+            timer = threading.Timer(delay, _flush_session, args=(session_id,))
+            timer.daemon = True
+            _pending_flushes[session_id] = timer
+            timer.start()
+        else:
+            _write_session(session_id, _session_cache[session_id])
+
 
+def _flush_all_sessions():
+    for session_id in list(_pending_flushes):
+        _flush_session(session_id)
 
-def save_session_data(session_id, data):
-    """Save session data to file."""
-    session_file = f'data/sessions/{session_id}.json'
-    with open(session_file, 'w') as f:
-        json.dump(data, f)
+
+atexit.register(_flush_all_sessions)
 
 
 @app.route('/')
@@ -70,71 +503,32 @@ def upload():
         csv_path = os.path.join(config.UPLOAD_FOLDER, f'schools_{session_id}.csv')
         csv_file.save(csv_path)
 
-        # Parse CSV
-        df = pd.read_csv(csv_path)
-
-        print(f"\n{'='*60}")
-        print(f"CSV PARSING DEBUG - {len(df)} rows")
-        print(f"Columns: {list(df.columns)}")
-        print(f"{'='*60}\n")
-
-        # Parse schools with embedded contacts
-        schools = []
-        for row_idx, row in df.iterrows():
-            school_dict = row.to_dict()
-            school_name = school_dict.get('School name', f'Unknown Row {row_idx}')
-
-            # Extract contacts if provided (Contact 1 Name, Contact 1 Email, etc.)
-            contacts = []
-            for i in range(1, 6):  # Support up to 5 contacts
-                name_col = f'Contact {i} Name'
-                email_col = f'Contact {i} Email'
-                title_col = f'Contact {i} Title'
-                bio_col = f'Contact {i} Bio'
-
-                if name_col in school_dict and pd.notna(school_dict[name_col]) and school_dict[name_col]:
-                    contact_email = str(school_dict.get(email_col, '')).strip() if pd.notna(school_dict.get(email_col)) else ''
-                    contact_name = str(school_dict[name_col]).strip()
-
-                    contact = {
-                        'name': contact_name,
-                        'email': contact_email,
-                        'title': str(school_dict.get(title_col, '')).strip() if pd.notna(school_dict.get(title_col)) else '',
-                        'bio': str(school_dict.get(bio_col, '')).strip() if pd.notna(school_dict.get(bio_col)) else '',
-                        'confidence': 100,  # Pre-researched contacts are high confidence
-                        'source': 'CSV (pre-researched)',
-                        'flagged': False
-                    }
-                    contacts.append(contact)
-
-                    # DEBUG: Print each school-contact mapping
-                    print(f"  Row {row_idx}: {school_name} -> {contact_name} ({contact_email})")
-
-            # Add pre-researched contacts to school data
-            if contacts:
-                school_dict['_preresearched_contacts'] = contacts
-                print(f"✓ School '{school_name}' has {len(contacts)} contacts")
-            else:
-                print(f"⚠ School '{school_name}' has NO pre-researched contacts (will use web search)")
+        # Check the header before paying for a full parse
+        missing = [column for column in REQUIRED_COLUMNS if column not in read_csv_header(csv_path)]
+        if missing:
+            return jsonify({'error': f"CSV is missing required columns: {', '.join(missing)}"}), 400
 
-            schools.append(school_dict)
+        # Parse CSV (through the cache, so the first generation reuses this parse)
+        fingerprint = csv_fingerprint(csv_path)
+        schools, columns = load_schools_cached(csv_path, *fingerprint)
 
-        print(f"\n{'='*60}")
-        print(f"Total schools parsed: {len(schools)}")
-        print(f"{'='*60}\n")
+        logger.info("Total schools parsed: %d", len(schools))
+        logger.info("Columns: %s", columns)
 
-        # Store in session file
+        # Store in session file. The schools are re-read from the saved CSV when
+        # generating, rather than copied into the session as (much larger) JSON
         session_data = {
             'csv_path': csv_path,
+            'csv_fingerprint': fingerprint,
             'template': template,
-            'schools': schools
+            'n_rows': len(schools)
         }
         save_session_data(session_id, session_data)
 
         response = make_response(jsonify({
             'success': True,
             'school_count': len(schools),
-            'columns': list(df.columns)
+            'columns': columns
         }))
         response.set_cookie('session_id', session_id, max_age=3600*24)  # 24 hours
         return response
@@ -154,6 +548,13 @@ def generate():
         if not config.ANTHROPIC_API_KEY:
             return jsonify({'error': 'ANTHROPIC_API_KEY not configured'}), 500
 
+        # Get data from session
+        schools = session_schools(session_data)
+        template = session_data.get('template')
+
+        if not schools or not template:
+            return jsonify({'error': 'Please upload CSV and template first'}), 400
+
         # Only require Brave API if we need to do web search
         has_preresearched_contacts = all(
             school.get('_preresearched_contacts') for school in schools
@@ -161,44 +562,27 @@ def generate():
         if not has_preresearched_contacts and not config.BRAVE_API_KEY:
             return jsonify({'error': 'BRAVE_API_KEY not configured (required for contact research)'}), 500
 
-        # Get data from session
-        schools = session_data.get('schools')
-        template = session_data.get('template')
-
-        if not schools or not template:
-            return jsonify({'error': 'Please upload CSV and template first'}), 400
-
         # Initialize generator
-        generator = EmailGenerator(
-            config.ANTHROPIC_API_KEY,
-            config.BRAVE_API_KEY
-        )
+        generator = get_generator()
 
         # Generate emails
-        print(f"Generating emails for {len(schools)} schools...")
+        logger.info("Generating emails for %d schools...", len(schools))
         results = generator.generate_emails_for_schools(schools, template)
 
         # Format for export
-        export_data = generator.format_results_for_export(results)
+        export_data = list(generator.format_results_for_export(results))
 
         # Store results
-        session_data['results'] = results
-        session_data['export_data'] = export_data
+        session_data['results'] = EmailGenerator.serialize_results(results)
+        set_export_data(session_data, export_data)
         save_session_data(session_id, session_data)
 
         # Calculate stats
-        total_emails = len(export_data)
-        flagged_count = sum(1 for row in export_data if row['Flags'])
-        avg_confidence = sum(row['Confidence Score'] for row in export_data) / total_emails if total_emails > 0 else 0
+        stats = export_stats(export_data)
 
-        print(f"Generated {total_emails} emails, {flagged_count} flagged")
+        logger.info("Generated %d emails, %d flagged", stats['total_emails'], stats['flagged_count'])
 
-        return jsonify({
-            'success': True,
-            'total_emails': total_emails,
-            'flagged_count': flagged_count,
-            'avg_confidence': int(avg_confidence)
-        })
+        return jsonify({'success': True, **stats})
 
     except Exception as e:
         import traceback
@@ -206,36 +590,40 @@ def generate():
         return jsonify({'error': str(e)}), 500
 
 
-# Global progress queues for SSE
-progress_queues = {}
+# Seconds without progress before an SSE keepalive comment is sent
+SSE_KEEPALIVE_SECONDS = 15
+# Long-lived threads that run streamed generations, so concurrent runs are bounded
+generation_executor = ThreadPoolExecutor(
+    max_workers=config.MAX_GENERATION_JOBS, thread_name_prefix='generation'
+)
+# Submitted generation runs by session id, as (future, cancel event, progress queue)
+generation_jobs = {}
+generation_jobs_lock = threading.Lock()
+# Sent to a stream whose run was replaced by a newer one for the same session
+SUPERSEDED_MESSAGE = 'Generation was cancelled because a newer run for this session started'
 
 
 @app.route('/generate-stream')
 def generate_stream():
     """Generate emails with Server-Sent Events for real-time progress."""
-    session_id = request.cookies.get('session_id')
+    session_id = cookie_session_id()
     if not session_id:
         return jsonify({'error': 'No session'}), 400
 
     session_data = get_session_data(session_id)
-    schools = session_data.get('schools')
+    schools = session_schools(session_data)
     template = session_data.get('template')
 
     if not schools or not template:
         return jsonify({'error': 'Please upload CSV and template first'}), 400
 
     # Create a queue for this session
-    progress_queue = queue.Queue()
-    progress_queues[session_id] = progress_queue
+    progress_queue = queue.SimpleQueue()
+    done = threading.Event()
+    cancel = threading.Event()
 
     def generate():
         try:
-            # Initialize generator
-            generator = EmailGenerator(
-                config.ANTHROPIC_API_KEY,
-                config.BRAVE_API_KEY
-            )
-
             # Progress callback that sends SSE events
             def progress_callback(school_idx, total_schools, school_name, step, detail=""):
                 event_data = {
@@ -247,30 +635,29 @@ def generate_stream():
                 }
                 progress_queue.put(('progress', event_data))
 
+            # Initialize generator
+            generator = get_generator()
+
             # Generate emails with progress callback
             results = generator.generate_emails_for_schools(
-                schools, template, progress_callback
+                schools, template, progress_callback, cancel
             )
 
+            if cancel.is_set():
+                # Superseded mid-run; leave the session to the newer run
+                progress_queue.put(('error', {'message': SUPERSEDED_MESSAGE}))
+                return
+
             # Format for export
-            export_data = generator.format_results_for_export(results)
+            export_data = list(generator.format_results_for_export(results))
 
             # Store results
-            session_data['results'] = results
-            session_data['export_data'] = export_data
+            session_data['results'] = EmailGenerator.serialize_results(results)
+            set_export_data(session_data, export_data)
             save_session_data(session_id, session_data)
 
-            # Calculate stats
-            total_emails = len(export_data)
-            flagged_count = sum(1 for row in export_data if row['Flags'])
-            avg_confidence = sum(row['Confidence Score'] for row in export_data) / total_emails if total_emails > 0 else 0
-
-            # Send completion event
-            progress_queue.put(('complete', {
-                'total_emails': total_emails,
-                'flagged_count': flagged_count,
-                'avg_confidence': int(avg_confidence)
-            }))
+            # Send completion event with stats
+            progress_queue.put(('complete', export_stats(export_data)))
 
         except Exception as e:
             import traceback
@@ -278,28 +665,47 @@ def generate_stream():
             progress_queue.put(('error', {'message': str(e)}))
 
         finally:
-            # Clean up
-            if session_id in progress_queues:
-                del progress_queues[session_id]
-
-    # Start generation in background thread
-    thread = threading.Thread(target=generate)
-    thread.start()
+            done.set()
+
+    # Queue generation on the worker pool, cancelling any earlier run of this session
+    with generation_jobs_lock:
+        previous = generation_jobs.get(session_id)
+        if previous:
+            previous_job, previous_cancel, previous_queue = previous
+            previous_cancel.set()
+            if previous_job.cancel():
+                # Never started, so its stream gets no final event from the run itself
+                previous_queue.put(('error', {'message': SUPERSEDED_MESSAGE}))
+        job = generation_executor.submit(generate)
+        generation_jobs[session_id] = (job, cancel, progress_queue)
 
     def event_stream():
-        while True:
-            try:
-                event_type, data = progress_queue.get(timeout=120)
-                yield f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
-                if event_type in ('complete', 'error'):
-                    break
-            except queue.Empty:
-                # Send keepalive
-                yield f": keepalive\n\n"
+        try:
+            while True:
+                try:
+                    event_type, data = progress_queue.get(timeout=SSE_KEEPALIVE_SECONDS)
+                    # Frame events as bytes so nothing is re-encoded on the way out
+                    yield b"event: " + event_type.encode() + b"\ndata: " + dump_json(data) + b"\n\n"
+                    if event_type in ('complete', 'error'):
+                        break
+                except queue.Empty:
+                    if done.is_set() or job.cancelled():
+                        # Generation ended without a final event
+                        break
+                    # Send keepalive
+                    yield b": keepalive\n\n"
+        finally:
+            # If the client went away while the run was still queued, drop it
+            job.cancel()
+            with generation_jobs_lock:
+                current = generation_jobs.get(session_id)
+                if current and current[0] is job:
+                    del generation_jobs[session_id]
 
     return Response(
         event_stream(),
         mimetype='text/event-stream',
+        direct_passthrough=True,
         headers={
             'Cache-Control': 'no-cache',
             'X-Accel-Buffering': 'no'
@@ -321,8 +727,12 @@ def update_email():
         export_data = session_data.get('export_data', [])
         if 0 <= index < len(export_data):
             export_data[index].update(updated_email)
-            session_data['export_data'] = export_data
-            save_session_data(session_id, session_data)
+            set_export_data(session_data, export_data)
+            # Reviewers edit in quick succession; batch those into one write
+            save_session_data(
+                session_id, session_data, delay=config.SESSION_FLUSH_DELAY,
+                fields=('export_data', 'export_version')
+            )
             return jsonify({'success': True})
         else:
             return jsonify({'error': 'Invalid index'}), 400
@@ -342,24 +752,21 @@ def download():
         if not export_data:
             return jsonify({'error': 'No data to export'}), 400
 
-        # Create DataFrame
-        df = pd.DataFrame(export_data)
+        cached = not_modified(session_data)
+        if cached:
+            return cached
 
-        # Save to CSV with proper quoting for long text fields
-        import csv
-        output_path = os.path.join(
-            config.OUTPUT_FOLDER,
-            f'theo_emails_{session_id}.csv'
-        )
-        df.to_csv(
-            output_path,
-            index=False,
-            quoting=csv.QUOTE_ALL,  # Quote all fields to preserve newlines and special chars
-            escapechar='\\',
-            encoding='utf-8-sig'  # UTF-8 with BOM for Excel compatibility
-        )
+        def csv_stream():
+            # UTF-8 with BOM for Excel compatibility
+            yield '\ufeff'
+            yield from EmailGenerator.iter_csv(export_data)
 
-        return send_file(output_path, as_attachment=True, download_name='theo_emails.csv')
+        response = Response(
+            csv_stream(),
+            mimetype='text/csv',
+            headers={'Content-Disposition': 'attachment; filename=theo_emails.csv'}
+        )
+        return with_export_etag(response, session_data)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -370,12 +777,18 @@ def review():
     """Review page for generated emails."""
     session_id = get_session_id()
     session_data = get_session_data(session_id)
+    cached = not_modified(session_data)
+    if cached:
+        return cached
+
     export_data = session_data.get('export_data', [])
-    return render_template('review.html', emails=export_data)
+    response = make_response(render_template('review.html', emails=export_data))
+    return with_export_etag(response, session_data)
 
 
 if __name__ == '__main__':
     print("🚀 Starting Theo Email Generator")
     print(f"📊 Config: {config.MODEL}")
     print(f"🔑 API Keys configured: Anthropic={bool(config.ANTHROPIC_API_KEY)}, Brave={bool(config.BRAVE_API_KEY)}")
-    app.run(debug=True, port=5001, host='127.0.0.1')
+    # Threaded, so SSE streams and other requests are served concurrently
+    app.run(debug=config.DEBUG, threaded=True, port=5001, host='127.0.0.1')
@@ -16,14 +16,58 @@ TEMPERATURE = 0.7
 MIN_CONFIDENCE_SCORE = 70
 MIN_CONTACT_CONFIDENCE = 80
 
+# Self-critique only runs for deterministic scores in
+# [MIN_CONFIDENCE_SCORE - CRITIQUE_BAND_BELOW, MIN_CONFIDENCE_SCORE + CRITIQUE_BAND_ABOVE)
+CRITIQUE_BAND_BELOW = 15
+CRITIQUE_BAND_ABOVE = 10
+
+# Borderline emails from concurrent workers are critiqued together in one call
+CRITIQUE_BATCH_SIZE = 6  # Send a batch once this many emails are waiting
+CRITIQUE_BATCH_WAIT = 0.5  # ...or this many seconds after the first one arrived
+
 # Retry Settings
 MAX_RETRIES = 2
-RETRY_DELAY = 2
+RETRY_DELAY = 2  # Base delay (seconds) for exponential backoff on rate limits
+RETRY_MAX_DELAY = 30
+RETRY_JITTER = 1
+
+# Concurrency Settings
+MAX_WORKERS = 4  # Schools processed in parallel
+MAX_CONTACT_WORKERS = 3  # Contacts per school written in parallel
+MAX_RESEARCH_WORKERS = 2  # Contact research batches searched in parallel
+MAX_GENERATION_JOBS = 2  # Streamed generation runs at once; further runs wait their turn
+ANTHROPIC_RPS = 2  # Client-side cap on Anthropic requests per second
+RPM_LIMIT = 50  # Anthropic requests per minute (match your API tier)
+TPM_LIMIT = 80000  # Anthropic input + output tokens per minute (match your API tier)
+
+# Generation Settings
+SHARE_EMAIL_ACROSS_CONTACTS = False  # Opt in to one email per school for contacts without a bio
 
 # Search Settings
 MAX_CONTACTS_PER_SCHOOL = 3
 SEARCH_RESULTS_LIMIT = 10
+CONTACT_BATCH_SIZE = 5  # Schools researched per web search call
+
+# Contact Cache Settings
+CONTACT_CACHE_ENABLED = os.getenv("CONTACT_CACHE", "1") != "0"  # Set CONTACT_CACHE=0 to disable
+CONTACT_CACHE_TTL_SECONDS = 30 * 24 * 3600
+
+# Email Cache Settings
+EMAIL_CACHE_ENABLED = os.getenv("EMAIL_CACHE", "1") != "0"  # Set EMAIL_CACHE=0 to disable
+EMAIL_CACHE_TTL_SECONDS = 14 * 24 * 3600
+
+# Session Settings
+SESSION_CACHE_SIZE = 32  # Parsed sessions kept in memory
+SESSION_FLUSH_DELAY = 0.5  # Seconds to coalesce review edits before writing the session
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # WARNING silences per-email progress; DEBUG adds per-row CSV parsing
+
+# Server
+# Werkzeug debugger and reloader; set FLASK_DEBUG=1 for local development only
+DEBUG = os.getenv("FLASK_DEBUG", "0") == "1"
 
 # File Paths
 UPLOAD_FOLDER = "data/uploads"
-OUTPUT_FOLDER = "data/outputs"
+CACHE_DIR = "data/cache"
+SESSION_DB = "data/sessions/sessions.db"  # SQLite store for upload and review sessions